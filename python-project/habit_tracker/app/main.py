@@ -1,21 +1,57 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routers import auth, habits, analytics
+from app.routers import auth, habits, analytics, admin
 from app.services.habits import create_habit, get_habit, get_habits, update_habit, checkoff_habit, delete_habit, create_habit_event, get_habit_events
 from app.services.users import get_user_by_email, create_user
-from app.database import engine, Base, SessionLocal
+from app.services.invalidation import start_invalidation_listener
+from app.services.purger import habit_purger
+from app.services.scheduler import status_scheduler
+from app.database import Base, shards
+from app.utils.memory import MEMORY_TRACKING, MemoryTrackingMiddleware, start_memory_tracking
+from app.utils.profiling import ProfilingMiddleware
 from app import models, schemas
 from datetime import datetime, timedelta
 
-app = FastAPI()
+# Seed the example user and habits at startup; set SEED_DATABASE=0 to skip
+SEED_DATABASE = os.getenv("SEED_DATABASE", "1") == "1"
 
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepare the database and start and stop the background tasks of a worker process.
+
+    Args:
+        app (FastAPI): The application instance.
+    """
+    if MEMORY_TRACKING:
+        start_memory_tracking()  # Per-route allocation peaks and top allocation sites
+    for shard_engine in shards.engines:
+        Base.metadata.create_all(bind=shard_engine)
+    if SEED_DATABASE:
+        init_db()
+    # Evict cache entries changed by other workers and nodes, listening on every shard
+    listeners = [start_invalidation_listener(shard_engine) for shard_engine in shards.engines]
+    status_scheduler.start()  # Precompute streaks and broken flags after each day rollover
+    habit_purger.start()  # Remove deleted habits and their events in batches
+    yield
+    await habit_purger.stop()
+    await status_scheduler.stop()
+    for listener in listeners:
+        if listener:
+            listener.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware)  # Opt-in per-request CPU profiles
+app.add_middleware(MemoryTrackingMiddleware)  # Per-route allocation peaks, when MEMORY_TRACKING=1
 
 # Predefined habits and example tracking data
 def init_db():
-    db = SessionLocal()
-
-    # Create a default user if not exists
+    # Create a default user if not exists, on the shard of its email
     default_user_email = "example@example.com"
+    db = shards.session(shards.shard_for_email(default_user_email))
     existing_user = get_user_by_email(db, email=default_user_email)
     if not existing_user:
         # Create a UserCreate object
@@ -52,8 +88,7 @@ def init_db():
 
     db.close()
 
-init_db()
-
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(habits.router, prefix="/habits", tags=["habits"])
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])  # Include the analytics router
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -15,6 +15,8 @@ class User(Base):
         last_name (str): Last name of the user.
         email (str): Email address of the user (unique).
         hashed_password (str): Hashed password of the user.
+        timezone (str): IANA time zone the user's days are counted in.
+        habits_version (int): Incremented whenever one of the user's habits or their events change.
 
     Relationships:
         habits (relationship): One-to-many relationship with Habit model via owner_id.
@@ -25,6 +27,8 @@ class User(Base):
     last_name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    timezone = Column(String, default="UTC", nullable=False)
+    habits_version = Column(Integer, default=0, nullable=False)
 
     habits = relationship("Habit", back_populates="owner")
 
@@ -41,21 +45,38 @@ class Habit(Base):
         periodicity (str): Frequency of the habit (e.g., daily, weekly).
         created_at (DateTime): Timestamp of when the habit was created.
         owner_id (int): Foreign key linking to the User who owns this habit.
+        streak (int): Precomputed streak, valid for the day in status_day.
+        is_broken (bool): Precomputed broken flag, valid for the day in status_day.
+        status_day (Date): Owner's local day the precomputed streak and broken flag were computed for.
+        next_due_at (DateTime): Moment the habit breaks unless checked off, or None if it cannot break.
+        version (int): Incremented whenever the habit or its events change.
+        deleted_at (DateTime): When the habit was deleted, or None; deleted habits are hidden
+            from every query until the purger removes them with their events.
 
     Relationships:
         owner (relationship): Many-to-one relationship with User model via owner_id.
         events (relationship): One-to-many relationship with HabitEvent model via habit_id.
     """
     __tablename__ = "habits"
+    __table_args__ = (
+        # Serves the due-habits queue as a single range scan
+        Index("ix_habits_next_due_at_id", "next_due_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, index=True)
     periodicity = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    streak = Column(Integer, nullable=True)
+    is_broken = Column(Boolean, nullable=True)
+    status_day = Column(Date, nullable=True)
+    next_due_at = Column(DateTime, nullable=True)
+    version = Column(Integer, default=1, nullable=False)
+    deleted_at = Column(DateTime, nullable=True, index=True)
 
     owner = relationship("User", back_populates="habits")
-    events = relationship("HabitEvent", back_populates="habit")
+    events = relationship("HabitEvent", back_populates="habit", passive_deletes=True)  # Never loaded for deletion
 
 
 class HabitEvent(Base):
@@ -66,14 +87,20 @@ class HabitEvent(Base):
         __tablename__ (str): Name of the database table for habit events.
         id (int): Primary key identifier for the event.
         habit_id (int): Foreign key linking to the Habit associated with this event.
-        timestamp (DateTime): Timestamp of when the event occurred.
+        timestamp (DateTime): Timestamp of when the event occurred (UTC).
+        local_day (Date): Calendar day of the event in the owner's time zone, computed at insert.
 
     Relationships:
         habit (relationship): Many-to-one relationship with Habit model via habit_id.
     """
     __tablename__ = "habit_events"
+    __table_args__ = (
+        # Serves the per-habit day scans of the streak and broken calculations
+        Index("ix_habit_events_habit_id_local_day", "habit_id", "local_day"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    habit_id = Column(Integer, ForeignKey("habits.id"))
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"))
     timestamp = Column(DateTime, default=datetime.utcnow)
+    local_day = Column(Date)
 
     habit = relationship("Habit", back_populates="events")
@@ -0,0 +1,100 @@
+"""
+Module: admin.py
+Defines operational endpoints, available only with the admin token.
+"""
+
+import tracemalloc
+
+from fastapi import APIRouter, Depends, Query
+from app import database
+from app.services.habits import get_row_counts
+from app.services.pubsub import habit_update_broker
+from app.utils.admission import admission_stats
+from app.utils.cache import analytics_cache
+from app.utils.memory import route_peaks, top_allocation_sites
+from app.utils.profiling import PROFILE_DIR, recent_profiles
+from app.utils.querylog import query_log
+from app.utils.security import require_admin
+from app.utils.singleflight import analytics_flights
+
+# Create a new API router instance; every endpoint requires the admin token
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/metrics/")
+def get_metrics_endpoint():
+    """
+    Report the load of this worker process.
+
+    Returns:
+        dict: Queue depth, active requests and shed counts of the admission-controlled routes,
+            analytics cache and request coalescing counters and the number of open live streams.
+    """
+    return {
+        "admission": admission_stats(),
+        "cache": analytics_cache.stats(),
+        "singleflight": analytics_flights.stats(),
+        "streams": {"connections": habit_update_broker.connections()},
+    }
+
+
+@router.get("/profiles/")
+def get_profiles_endpoint():
+    """
+    List the most recent request profiles of this worker process, newest first.
+
+    Profiles are requested with the `X-Profile: 1` header (plus the admin token) or taken
+    by PROFILE_SAMPLE_RATE sampling.
+
+    Returns:
+        dict: Directory holding the .pstats files and one summary with top frames per profile.
+    """
+    return {"directory": PROFILE_DIR, "profiles": list(reversed(recent_profiles))}
+
+
+@router.get("/slow-queries/")
+def get_slow_queries_endpoint():
+    """
+    List the most recent slow statements of this worker process, newest first.
+
+    Returns:
+        dict: Slow threshold, statement counters and the slow statements with their parameter
+            shapes and, for PostgreSQL SELECTs, their EXPLAIN (ANALYZE, BUFFERS) plan.
+    """
+    return query_log.stats()
+
+
+@router.get("/memory/")
+def get_memory_endpoint(limit: int = Query(20, ge=1, le=200),
+                        group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    """
+    Report the allocation peaks per route and the top allocation sites of this worker process.
+
+    Requires the worker to run with MEMORY_TRACKING=1.
+
+    Args:
+        limit (int, optional): Number of allocation sites. Defaults to 20.
+        group_by (str, optional): Group sites by "lineno", "filename" or "traceback". Defaults to "lineno".
+
+    Returns:
+        dict: Whether tracing is on, current and peak traced bytes, per-route peaks and top sites.
+    """
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {"tracing": tracing, "current_bytes": current, "peak_bytes": peak,
+            "routes": route_peaks.stats(), "top_sites": top_allocation_sites(limit, group_by)}
+
+
+@router.get("/shards/")
+def get_shards_endpoint():
+    """
+    Report the size of every database shard, counted on all shards in parallel.
+
+    Returns:
+        dict: Per-shard URL (without password) and row counts, and the totals across shards.
+    """
+    counts = database.shards.fan_out(get_row_counts)
+    totals = {key: sum(shard[key] for shard in counts) for key in counts[0]}
+    return {"shards": [{"index": index, "url": shard_engine.url.render_as_string(hide_password=True), **shard}
+                       for index, (shard_engine, shard) in enumerate(zip(database.shards.engines, counts))],
+            "totals": totals}
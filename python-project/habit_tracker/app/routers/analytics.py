@@ -2,16 +2,19 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app import database, schemas, models
 from app.services.habits import (
-    get_habits, get_habit_events
+    evaluate_habit, get_habit_rows, HABIT_ROW_FIELDS
 )
+from app.utils.admission import admission_control
+from app.utils.cache import analytics_cache
+from app.utils.profiling import ProfiledRoute
+from app.utils.responses import ORJSONResponse, rows_response
 from typing import List
-from datetime import timedelta
 
 # Create a new API router instance
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)  # Endpoints can be profiled in their worker thread
 
 
-@router.get("/habits/", response_model=List[schemas.Habit])
+@router.get("/habits/", response_model=List[schemas.Habit], response_class=ORJSONResponse)
 def get_all_habits_endpoint(user_id: int, db: Session = Depends(database.get_db)):
     """
     Retrieve all habits for a specific user.
@@ -23,10 +26,10 @@ def get_all_habits_endpoint(user_id: int, db: Session = Depends(database.get_db)
     Returns:
         List[schemas.Habit]: A list of habits belonging to the user.
     """
-    return get_habits(db, user_id=user_id)
+    return rows_response(get_habit_rows(db, user_id=user_id), HABIT_ROW_FIELDS)
 
 
-@router.get("/habits/periodicity/{periodicity}", response_model=List[schemas.Habit])
+@router.get("/habits/periodicity/{periodicity}", response_model=List[schemas.Habit], response_class=ORJSONResponse)
 def get_habits_by_periodicity_endpoint(user_id: int, periodicity: str, db: Session = Depends(database.get_db)):
     """
     Retrieve habits for a specific user filtered by periodicity.
@@ -39,10 +42,11 @@ def get_habits_by_periodicity_endpoint(user_id: int, periodicity: str, db: Sessi
     Returns:
         List[schemas.Habit]: A list of habits belonging to the user filtered by periodicity.
     """
-    return [habit for habit in get_habits(db, user_id=user_id) if habit.periodicity == periodicity]
+    return rows_response(get_habit_rows(db, user_id=user_id, periodicity=periodicity), HABIT_ROW_FIELDS)
 
 
-@router.get("/habits/longest_streak/", response_model=schemas.LongestStreakResponse)
+@router.get("/habits/longest_streak/", response_model=schemas.LongestStreakResponse,
+            dependencies=[Depends(admission_control("analytics.longest_streak"))])
 def get_longest_streak_endpoint(user_id: int, db: Session = Depends(database.get_db)):
     """
     Retrieve the longest streak among all habits for a specific user, including the habit IDs.
@@ -51,11 +55,31 @@ def get_longest_streak_endpoint(user_id: int, db: Session = Depends(database.get
         user_id (int): The ID of the current user.
         db (Session, optional): SQLAlchemy database session dependency. Defaults to Depends(database.get_db).
 
+    Returns:
+        schemas.LongestStreakResponse: The longest streak and corresponding habit IDs.
+
+    Raises:
+        HTTPException: If the user exceeds their rate limit (status_code=429) or the route is
+            saturated (status_code=503), both with a Retry-After header.
+    """
+    result = analytics_cache.cached(
+        ("longest_streak", user_id), lambda: get_longest_streak(user_id, db).model_dump(), user_id=user_id)
+    return schemas.LongestStreakResponse(**result)
+
+
+def get_longest_streak(user_id: int, db: Session):
+    """
+    Helper function to find the habits with the longest streak for a user.
+
+    Args:
+        user_id (int): The ID of the user.
+        db (Session): SQLAlchemy database session.
+
     Returns:
         schemas.LongestStreakResponse: The longest streak and corresponding habit IDs.
     """
     user_habits = db.query(models.Habit).filter(
-        models.Habit.owner_id == user_id).all()
+        models.Habit.owner_id == user_id, models.Habit.deleted_at.is_(None)).all()
     max_streak = 0
     habit_ids = []
 
@@ -81,27 +105,12 @@ def get_streak_for_habit(habit_id: int, db: Session):
     Returns:
         int: The longest streak for the specified habit.
     """
-    # Retrieve habit events from the database
-    events = get_habit_events(db, habit_id)
-    # Sort events by timestamp
-    events.sort(key=lambda x: x.timestamp)
-    streak = 0
-    max_streak = 0
-    last_date = None
-
-    # Calculate streaks based on consecutive dates
-    for event in events:
-        if last_date and event.timestamp.date() == (last_date + timedelta(days=1)):
-            streak += 1
-        else:
-            streak = 1
-        last_date = event.timestamp.date()
-        max_streak = max(max_streak, streak)
+    # Calculate streaks based on consecutive dates, streamed distinct and sorted by the database
+    return evaluate_habit(db, habit_id, "daily")[1].longest
 
-    return max_streak
 
-
-@router.get("/habits/{habit_id}/longest_streak/", response_model=int)
+@router.get("/habits/{habit_id}/longest_streak/", response_model=int,
+            dependencies=[Depends(admission_control("analytics.habit_longest_streak"))])
 def get_longest_streak_for_habit_endpoint(habit_id: int, db: Session = Depends(database.get_db)):
     """
     Retrieve the longest streak for a specific habit.
@@ -112,36 +121,10 @@ def get_longest_streak_for_habit_endpoint(habit_id: int, db: Session = Depends(d
 
     Returns:
         int: The longest streak for the specified habit.
-    """
-    return get_streak_for_habit(habit_id, db)
 
-
-def get_streak_for_habit_endpoint(habit_id: int, db: Session):
+    Raises:
+        HTTPException: If the user exceeds their rate limit (status_code=429) or the route is
+            saturated (status_code=503), both with a Retry-After header.
     """
-    Helper function to calculate the longest streak for a habit.
-
-    Args:
-        habit_id (int): The ID of the habit for which the longest streak is to be calculated.
-        db (Session): SQLAlchemy database session.
-
-    Returns:
-        int: The longest streak for the specified habit.
-    """
-    # Retrieve habit events from the database
-    events = get_habit_events(db, habit_id)
-    # Sort events by timestamp
-    events.sort(key=lambda x: x.timestamp)
-    streak = 0
-    max_streak = 0
-    last_date = None
-
-    # Calculate streaks based on consecutive dates
-    for event in events:
-        if last_date and event.timestamp.date() == (last_date + timedelta(days=1)):
-            streak += 1
-        else:
-            streak = 1
-        last_date = event.timestamp.date()
-        max_streak = max(max_streak, streak)
-
-    return max_streak
+    return analytics_cache.cached(
+        ("habit_longest_streak", habit_id), lambda: get_streak_for_habit(habit_id, db), habit_id=habit_id)
@@ -3,7 +3,7 @@ Module: auth.py
 Defines API endpoints related to user authentication.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app import schemas, database
 from app.services.users import get_user_by_email, create_user, pwd_context
@@ -11,7 +11,18 @@ from app.services.users import get_user_by_email, create_user, pwd_context
 # Create a new API router instance
 router = APIRouter()
 
-@router.post("/signup/", response_model=schemas.User)
+def route_by_email(user: schemas.UserCreate, request: Request):
+    """
+    Dependency placing a new user on the shard chosen by their email.
+
+    Args:
+        user (schemas.UserCreate): User creation details.
+        request (Request): The incoming request.
+    """
+    request.state.shard = database.shards.shard_for_email(user.email)  # Read by database.get_db
+
+
+@router.post("/signup/", response_model=schemas.User, dependencies=[Depends(route_by_email)])
 def create_user_endpoint(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     """
     Create a new user account.
@@ -1,15 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import heapq
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app import schemas, database
 from app.services.habits import (
-    create_habit, get_habit, get_habits, update_habit, checkoff_habit,
-    delete_habit, create_habit_event, get_habit_events, get_streak_for_habit,
-    is_habit_broken
+    create_habit, get_habit, update_habit, checkoff_habit,
+    delete_habit, create_habit_event, get_current_streak,
+    get_current_is_broken, get_habit_rows, get_due_habits, get_habit_event_rows,
+    get_habit_version, get_habits_version, get_dashboard_owner, get_dashboard,
+    HABIT_ROW_FIELDS, HABIT_EVENT_ROW_FIELDS, DUE_HABIT_FIELDS
 )
-from typing import List
+from app.services.batch import run_batch
+from app.services.pubsub import habit_update_broker
+from app.services.scheduler import status_scheduler
+from app.utils.admission import admission_control
+from app.utils.cache import analytics_cache
+from app.utils.profiling import ProfiledRoute
+from app.utils.responses import ORJSONResponse, conditional_response, make_etag, rows_response
+from app.utils.security import require_admin
+from app.utils.timezones import local_today
+from typing import List, Optional
+from datetime import datetime, timedelta
+
+# Seconds of silence after which a live stream sends a keep-alive comment
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "25"))
 
 # Create a new API router instance
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)  # Endpoints can be profiled in their worker thread
 
 
 @router.post("/", response_model=schemas.Habit)
@@ -28,18 +48,147 @@ def create_habit_endpoint(habit: schemas.HabitCreate, user_id: int, db: Session
     return create_habit(db=db, habit=habit, user_id=user_id)
 
 
-@router.get("/", response_model=List[schemas.Habit])
-def read_habits_endpoint(user_id: int, db: Session = Depends(database.get_db)):
+@router.post("/batch/", response_model=schemas.BatchResponse)
+def batch_endpoint(batch: schemas.BatchRequest, user_id: int, db: Session = Depends(database.get_db)):
+    """
+    Apply an ordered list of create, update, check-off and delete operations in one transaction.
+
+    Operations are applied with the same service functions as the single-operation endpoints.
+    A failed operation is rolled back alone and reported in its result; the others are
+    committed together. Later operations can reference habits created earlier in the batch
+    by their temp ID.
+
+    Args:
+        batch (schemas.BatchRequest): The operations to apply.
+        user_id (int): The ID of the user owning the habits.
+        db (Session, optional): The SQLAlchemy session dependency. Defaults to Depends(database.get_db).
+
+    Returns:
+        schemas.BatchResponse: Per-operation results and the IDs assigned to the temp IDs.
+    """
+    return run_batch(db, user_id, batch.operations)
+
+
+@router.get("/", response_model=List[schemas.Habit], response_class=ORJSONResponse)
+def read_habits_endpoint(user_id: int, request: Request, db: Session = Depends(database.get_db)):
     """
     Retrieve all habits belonging to a user.
 
+    The habits are selected as plain column rows and encoded directly,
+    skipping ORM hydration and per-row model validation. The response carries an ETag
+    derived from the user's habit version; a matching If-None-Match is answered with
+    304 after a single primary key lookup.
+
     Args:
         user_id (int): The ID of the user.
+        request (Request): The incoming request.
 
     Returns:
         List[schemas.Habit]: List of habits belonging to the user.
     """
-    return get_habits(db, user_id=user_id)
+    etag = make_etag("habits", user_id, get_habits_version(db, user_id))  # Looked up before the data
+    return conditional_response(
+        request, etag, lambda: rows_response(get_habit_rows(db, user_id=user_id), HABIT_ROW_FIELDS))
+
+
+@router.get("/dashboard/", response_model=List[schemas.DashboardHabit], response_class=ORJSONResponse,
+            dependencies=[Depends(admission_control("habits.dashboard"))])
+def read_dashboard_endpoint(user_id: int, request: Request, db: Session = Depends(database.get_db)):
+    """
+    Retrieve every habit of a user with its current and longest streak, broken flag and last check-off.
+
+    Replaces one habit list request plus a streak and broken request per habit, and runs
+    three queries whatever the number of habits. The ETag changes with the user's habit
+    version and local day; a matching If-None-Match is answered with 304 after the first query.
+
+    Args:
+        user_id (int): The ID of the user.
+        request (Request): The incoming request.
+        db (Session, optional): The SQLAlchemy session dependency. Defaults to Depends(database.get_db).
+
+    Returns:
+        List[schemas.DashboardHabit]: The user's habits ordered by ID.
+
+    Raises:
+        HTTPException: If the user exceeds their rate limit (status_code=429) or the route is
+            saturated (status_code=503), both with a Retry-After header.
+    """
+    owner = get_dashboard_owner(db, user_id)
+    if owner is None:
+        return ORJSONResponse([])  # Unknown user, no habits
+    etag = make_etag("dashboard", user_id, owner.habits_version, local_today(owner.timezone).isoformat())
+    return conditional_response(request, etag, lambda: ORJSONResponse(get_dashboard(db, user_id, owner.timezone)))
+
+
+@router.get("/stream/", response_class=StreamingResponse)
+async def stream_habit_updates_endpoint(user_id: int):
+    """
+    Stream check-offs, streak changes and broken-state changes of a user's habits as server-sent events.
+
+    Events are pushed when the change commits: "checkoff" (habit_id, timestamp),
+    "streak" (habit_id, streak) and "broken" (habit_id, is_broken). A "resync" event
+    tells the client that updates were lost and its state should be reloaded.
+
+    Args:
+        user_id (int): The ID of the user whose updates to stream.
+
+    Returns:
+        StreamingResponse: Never-ending text/event-stream response.
+    """
+    queue = habit_update_broker.subscribe(user_id)
+
+    async def events():
+        try:
+            yield b"retry: 5000\n\n"  # Reconnect delay for the client
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"  # Keeps proxies from closing idle connections
+        finally:
+            habit_update_broker.unsubscribe(user_id, queue)  # Client disconnected
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/due/", response_model=schemas.DueHabitPage)
+def read_due_habits_endpoint(within_minutes: int = 60, start: Optional[datetime] = None, cursor: Optional[str] = None,
+                             limit: int = Query(100, ge=1, le=1000), db: Session = Depends(database.get_db)):
+    """
+    Retrieve habits, across all users, that break within the given time window unless checked off.
+
+    With several shards, every shard is queried in parallel and the pages are merged.
+
+    Args:
+        within_minutes (int, optional): Length of the window in minutes. Defaults to 60.
+        start (datetime, optional): Start of the window (UTC). Defaults to now.
+        cursor (str, optional): Cursor returned with the previous page.
+        limit (int, optional): Maximum number of habits per page. Defaults to 100.
+        db (Session, optional): The SQLAlchemy session dependency. Defaults to Depends(database.get_db).
+
+    Returns:
+        schemas.DueHabitPage: One page of due habits and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status_code=400).
+    """
+    start = start or datetime.utcnow()
+    try:
+        after = None
+        if cursor:
+            due_at, habit_id = cursor.rsplit("|", 1)
+            after = (datetime.fromisoformat(due_at), int(habit_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    end = start + timedelta(minutes=within_minutes)
+    if database.shards.count > 1:  # Merge the first page of every shard by (next_due_at, id)
+        pages = database.shards.fan_out(lambda shard_db: get_due_habits(shard_db, start, end, cursor=after, limit=limit))
+        rows = list(heapq.merge(*pages, key=lambda row: (row.next_due_at, row.id)))[:limit]
+    else:
+        rows = get_due_habits(db, start, end, cursor=after, limit=limit)
+    next_cursor = f"{rows[-1].next_due_at.isoformat()}|{rows[-1].id}" if len(rows) == limit else None
+    return schemas.DueHabitPage(habits=[dict(zip(DUE_HABIT_FIELDS, row)) for row in rows], next_cursor=next_cursor)
 
 
 @router.put("/{habit_id}", response_model=schemas.Habit)
@@ -108,7 +257,36 @@ def delete_habit_endpoint(habit_id: int, db: Session = Depends(database.get_db))
     return delete_habit(db=db, habit_id=habit_id)
 
 
-@router.post("/event/", response_model=schemas.HabitEvent)
+@router.post("/status/refresh/", status_code=202, dependencies=[Depends(require_admin)])
+async def refresh_habit_statuses_endpoint():
+    """
+    Request an immediate recomputation of the precomputed streaks and broken flags.
+
+    The recomputation scans every habit in the background; at most one run is active
+    across all workers. Requires the admin token.
+
+    Returns:
+        dict: Message indicating the recomputation was scheduled.
+
+    Raises:
+        HTTPException: If the admin token is missing or wrong (status_code=403).
+    """
+    status_scheduler.trigger()
+    return {"message": "Habit status refresh scheduled"}
+
+
+def route_by_event_habit(habit_event: schemas.HabitEventCreate, request: Request):
+    """
+    Dependency routing an event to the shard of its habit.
+
+    Args:
+        habit_event (schemas.HabitEventCreate): The data to create the habit event.
+        request (Request): The incoming request.
+    """
+    request.state.shard = database.shards.shard_for_id(habit_event.habit_id)  # Read by database.get_db
+
+
+@router.post("/event/", response_model=schemas.HabitEvent, dependencies=[Depends(route_by_event_habit)])
 def create_habit_event_endpoint(habit_event: schemas.HabitEventCreate, db: Session = Depends(database.get_db)):
     """
     Create a new event for a habit.
@@ -123,32 +301,45 @@ def create_habit_event_endpoint(habit_event: schemas.HabitEventCreate, db: Sessi
     return create_habit_event(db=db, habit_event=habit_event)
 
 
-@router.get("/{habit_id}/events/", response_model=List[schemas.HabitEvent])
-def read_habit_events_endpoint(habit_id: int, db: Session = Depends(database.get_db)):
+@router.get("/{habit_id}/events/", response_model=List[schemas.HabitEvent], response_class=ORJSONResponse)
+def read_habit_events_endpoint(habit_id: int, request: Request, db: Session = Depends(database.get_db)):
     """
     Retrieve all events associated with a specific habit.
 
+    The events are selected as plain column rows and encoded directly,
+    skipping ORM hydration and per-row model validation. The response carries an ETag
+    derived from the habit's version; a matching If-None-Match is answered with 304.
+
     Args:
         habit_id (int): The ID of the habit.
+        request (Request): The incoming request.
 
     Returns:
         List[schemas.HabitEvent]: List of events associated with the habit.
     """
-    return get_habit_events(db, habit_id=habit_id)
+    etag = make_etag("habit-events", habit_id, get_habit_version(db, habit_id))  # Looked up before the data
+    return conditional_response(
+        request, etag, lambda: rows_response(get_habit_event_rows(db, habit_id=habit_id), HABIT_EVENT_ROW_FIELDS))
 
 
 @router.get("/{habit_id}/streak/", response_model=int)
-def get_streak_endpoint(habit_id: int, db: Session = Depends(database.get_db)):
+def get_streak_endpoint(habit_id: int, request: Request, db: Session = Depends(database.get_db)):
     """
     Get the current streak (number of consecutive days) for a habit.
 
+    The response carries an ETag derived from the habit's version; a matching
+    If-None-Match is answered with 304.
+
     Args:
         habit_id (int): The ID of the habit.
+        request (Request): The incoming request.
 
     Returns:
         int: The current streak for the habit.
     """
-    return get_streak_for_habit(habit_id=habit_id, db=db)
+    etag = make_etag("habit-streak", habit_id, get_habit_version(db, habit_id))  # Looked up before the data
+    return conditional_response(request, etag, lambda: ORJSONResponse(analytics_cache.cached(
+        ("streak", habit_id), lambda: get_current_streak(db, habit_id=habit_id), habit_id=habit_id)))
 
 
 @router.get("/{habit_id}/is_broken/", response_model=bool)
@@ -162,4 +353,5 @@ def is_habit_broken_endpoint(habit_id: int, db: Session = Depends(database.get_d
     Returns:
         bool: True if the habit's streak is broken, False otherwise.
     """
-    return is_habit_broken(habit_id=habit_id, db=db)
+    return analytics_cache.cached(
+        ("is_broken", habit_id), lambda: get_current_is_broken(db, habit_id=habit_id), habit_id=habit_id)
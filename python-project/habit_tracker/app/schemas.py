@@ -1,6 +1,21 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Literal, Optional, Union
 from datetime import datetime
+from app.services.periodicity import compile_periodicity
+from app.utils.timezones import DEFAULT_TIMEZONE, get_zone
+
+
+def _validate_periodicity(value):
+    """Reject periodicities the rule engine cannot evaluate."""
+    if value is not None:
+        compile_periodicity(value)  # Raises ValueError, reported as a validation error
+    return value
+
+
+def _validate_timezone(value):
+    """Reject unknown time zone names."""
+    get_zone(value)  # Raises ValueError, reported as a validation error
+    return value
 
 
 class UserCreate(BaseModel):
@@ -12,11 +27,15 @@ class UserCreate(BaseModel):
         last_name (str): Last name of the user.
         email (str): Email address of the user.
         password (str): Password for the user.
+        timezone (str, optional): IANA time zone the user's days are counted in. Defaults to UTC.
     """
     first_name: str
     last_name: str
     email: str
     password: str
+    timezone: str = DEFAULT_TIMEZONE
+
+    _check_timezone = field_validator("timezone")(_validate_timezone)
 
 
 class User(BaseModel):
@@ -28,6 +47,7 @@ class User(BaseModel):
         first_name (str): First name of the user.
         last_name (str): Last name of the user.
         email (str): Email address of the user.
+        timezone (str): IANA time zone the user's days are counted in.
 
     Config:
         from_attributes (bool): Enables automatic creation from attributes.
@@ -36,6 +56,7 @@ class User(BaseModel):
     first_name: str
     last_name: str
     email: str
+    timezone: str
 
     class Config:
         from_attributes = True
@@ -48,12 +69,14 @@ class HabitCreate(BaseModel):
     Attributes:
         name (str): Name of the habit.
         description (str): Description of the habit.
-        periodicity (str): Frequency of the habit (e.g., daily, weekly).
+        periodicity (str): Frequency of the habit (e.g., daily, weekly, "3 times per week").
     """
     name: str
     description: str
     periodicity: str
 
+    _check_periodicity = field_validator("periodicity")(_validate_periodicity)
+
 
 class HabitUpdate(BaseModel):
     """
@@ -68,6 +91,8 @@ class HabitUpdate(BaseModel):
     description: Optional[str]
     periodicity: Optional[str]
 
+    _check_periodicity = field_validator("periodicity")(_validate_periodicity)
+
 
 class Habit(BaseModel):
     """
@@ -125,6 +150,119 @@ class HabitEvent(BaseModel):
         from_attributes = True
 
 
+class DashboardHabit(BaseModel):
+    """
+    Pydantic model for a habit on the dashboard.
+
+    Attributes:
+        id (int): Identifier for the habit.
+        name (str): Name of the habit.
+        description (str): Description of the habit.
+        periodicity (str): Frequency of the habit.
+        created_at (datetime): Timestamp of when the habit was created.
+        current_streak (int): Streak still alive today, in periods.
+        longest_streak (int): Longest streak, in periods.
+        is_broken (bool): Whether the habit is broken today.
+        last_checkoff_at (datetime, optional): Timestamp of the latest check-off, if any.
+    """
+    id: int
+    name: str
+    description: str
+    periodicity: str
+    created_at: datetime
+    current_streak: int
+    longest_streak: int
+    is_broken: bool
+    last_checkoff_at: Optional[datetime] = None
+
+
+class BatchOperation(BaseModel):
+    """
+    Pydantic model for one operation of a batch request.
+
+    Attributes:
+        op (str): Operation: "create", "update", "checkoff" or "delete".
+        habit_id (int or str, optional): Habit the operation applies to, or the temp ID of a
+            habit created earlier in the batch. Required except for "create".
+        temp_id (str, optional): Client-side ID of the habit created by a "create" operation.
+        data (dict, optional): HabitCreate data for "create", HabitUpdate data for "update".
+    """
+    op: Literal["create", "update", "checkoff", "delete"]
+    habit_id: Optional[Union[int, str]] = None
+    temp_id: Optional[str] = None
+    data: Optional[dict] = None
+
+
+class BatchRequest(BaseModel):
+    """
+    Pydantic model for a batch request.
+
+    Attributes:
+        operations (List[BatchOperation]): Operations, applied in order.
+    """
+    operations: List[BatchOperation] = Field(max_length=500)
+
+
+class BatchResult(BaseModel):
+    """
+    Pydantic model for the result of one batch operation.
+
+    Attributes:
+        index (int): Position of the operation in the request.
+        op (str): Operation that was applied.
+        status_code (int): HTTP status code the equivalent single request would have returned.
+        habit (Habit, optional): The created, updated, checked off or deleted habit, on success.
+        detail (str, optional): Description of the failure, on error.
+    """
+    index: int
+    op: str
+    status_code: int
+    habit: Optional[Habit] = None
+    detail: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    """
+    Pydantic model for the response to a batch request.
+
+    Attributes:
+        results (List[BatchResult]): One result per operation, in request order.
+        temp_ids (Dict[str, int]): IDs assigned to the habits created with a temp ID.
+    """
+    results: List[BatchResult]
+    temp_ids: Dict[str, int]
+
+
 class LongestStreakResponse(BaseModel):
     longest_streak: int
     habit_ids: List[int]
+
+
+class DueHabit(BaseModel):
+    """
+    Pydantic model for a habit in the due-habits queue.
+
+    Attributes:
+        id (int): Identifier for the habit.
+        name (str): Name of the habit.
+        periodicity (str): Frequency of the habit.
+        owner_id (int): Identifier of the owner user.
+        next_due_at (datetime): Moment the habit breaks unless checked off.
+    """
+    id: int
+    name: str
+    periodicity: str
+    owner_id: int
+    next_due_at: datetime
+
+
+class DueHabitPage(BaseModel):
+    """
+    Pydantic model for one page of the due-habits queue.
+
+    Attributes:
+        habits (List[DueHabit]): Habits ordered by next_due_at, then ID.
+        next_cursor (str, optional): Cursor of the next page, or None on the last page.
+    """
+    habits: List[DueHabit]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,115 @@
+# habit_tracker/app/services/batch.py
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app import schemas
+from app.services.habits import checkoff_habit, create_habit, delete_habit, get_habit, update_habit
+
+
+class BatchOperationError(Exception):
+    """
+    Failure of a single batch operation, reported in its result.
+
+    Attributes:
+        status_code (int): HTTP status code the equivalent single request would have returned.
+        detail (str): Description of the failure.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def run_batch(db: Session, user_id: int, operations):
+    """
+    Apply an ordered list of habit operations of a user in one transaction.
+
+    Each operation runs in its own savepoint, so a failed operation is rolled back alone
+    and reported in its result while the others are kept; everything is committed once
+    at the end. Habits created in the batch can be referenced by later operations
+    through their client-side temp ID.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): ID of the user owning the habits.
+        operations (List[schemas.BatchOperation]): Operations in the order they are applied.
+
+    Returns:
+        schemas.BatchResponse: One result per operation and the IDs assigned to the temp IDs.
+    """
+    temp_ids = {}
+    results = []
+    for index, operation in enumerate(operations):
+        savepoint = db.begin_nested()
+        try:
+            db_habit = _apply_operation(db, user_id, operation, temp_ids)
+            habit = schemas.Habit.model_validate(db_habit)  # Snapshot before later operations change it
+            savepoint.commit()
+        except BatchOperationError as error:
+            savepoint.rollback()  # Undo this operation only
+            results.append(schemas.BatchResult(
+                index=index, op=operation.op, status_code=error.status_code, detail=error.detail))
+            continue
+        if operation.op == "create" and operation.temp_id is not None:
+            temp_ids[operation.temp_id] = habit.id
+        results.append(schemas.BatchResult(index=index, op=operation.op, status_code=200, habit=habit))
+    db.commit()  # Single commit for the whole batch
+    return schemas.BatchResponse(results=results, temp_ids=temp_ids)
+
+
+def _apply_operation(db: Session, user_id: int, operation, temp_ids):
+    """
+    Apply one batch operation without committing.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): ID of the user owning the habits.
+        operation (schemas.BatchOperation): Operation to apply.
+        temp_ids (Dict[str, int]): IDs of the habits created earlier in the batch, by temp ID.
+
+    Returns:
+        models.Habit: The created, updated, checked off or deleted habit.
+
+    Raises:
+        BatchOperationError: If the operation is invalid or its habit is not found.
+    """
+    try:
+        if operation.op == "create":
+            return create_habit(db, schemas.HabitCreate(**(operation.data or {})), user_id, commit=False)
+        habit_id = _resolve_habit_id(db, user_id, operation.habit_id, temp_ids)
+        if operation.op == "update":
+            return update_habit(db, schemas.HabitUpdate(**(operation.data or {})), habit_id, commit=False)
+        if operation.op == "checkoff":
+            return checkoff_habit(db, habit_id, user_id, commit=False)
+        return delete_habit(db, habit_id, commit=False)
+    except ValidationError as error:
+        raise BatchOperationError(422, str(error))
+
+
+def _resolve_habit_id(db: Session, user_id: int, habit_id, temp_ids):
+    """
+    Resolve the habit referenced by an operation to the ID of one of the user's habits.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): ID of the user owning the habits.
+        habit_id (Union[int, str]): Habit ID, or temp ID of a habit created earlier in the batch.
+        temp_ids (Dict[str, int]): IDs of the habits created earlier in the batch, by temp ID.
+
+    Returns:
+        int: ID of the habit.
+
+    Raises:
+        BatchOperationError: If the habit is missing, unknown or owned by another user.
+    """
+    if habit_id is None:
+        raise BatchOperationError(400, "habit_id is required")
+    if isinstance(habit_id, str):
+        if habit_id not in temp_ids:
+            raise BatchOperationError(400, f"Unknown temp ID: {habit_id!r}")
+        habit_id = temp_ids[habit_id]
+    db_habit = get_habit(db, habit_id=habit_id)
+    if not db_habit or db_habit.owner_id != user_id:
+        raise BatchOperationError(404, "Habit not found or does not belong to the user")
+    return habit_id
@@ -1,13 +1,37 @@
+from itertools import groupby
+from sqlalchemy import func, select, tuple_, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from app import models, schemas
+from app.services.invalidation import publish_invalidation
+from app.services.periodicity import StreakSummary, habit_rule
+from app.services.pubsub import publish_habit_update
+from app.utils.timezones import local_day, local_midnight_utc, local_today
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from datetime import date, datetime
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Columns selected by the row-based list queries, in response field order
+HABIT_ROW_FIELDS = ("id", "name", "description", "periodicity", "created_at", "owner_id")
+HABIT_EVENT_ROW_FIELDS = ("id", "habit_id", "timestamp")
 
-def create_habit(db: Session, habit: schemas.HabitCreate, user_id: int):
+# Number of day rows fetched per round trip when streaming event days
+DAY_STREAM_BATCH_SIZE = 1000
+
+# Columns returned by the due-habits queue
+DUE_HABIT_FIELDS = ("id", "name", "periodicity", "owner_id", "next_due_at")
+
+# Number of events updated per batch when backfilling local days
+LOCAL_DAY_BACKFILL_BATCH_SIZE = 1000
+
+# Habit columns returned by the dashboard, followed by the computed DASHBOARD_STATUS_FIELDS
+DASHBOARD_HABIT_FIELDS = ("id", "name", "description", "periodicity", "created_at")
+DASHBOARD_STATUS_FIELDS = ("current_streak", "longest_streak", "is_broken", "last_checkoff_at")
+
+
+def create_habit(db: Session, habit: schemas.HabitCreate, user_id: int, commit: bool = True):
     """
     Create a new habit for a specific user in the database.
 
@@ -15,6 +39,7 @@ def create_habit(db: Session, habit: schemas.HabitCreate, user_id: int):
         db (Session): SQLAlchemy database session.
         habit (schemas.HabitCreate): Habit data to create.
         user_id (int): User ID who owns the habit.
+        commit (bool, optional): Commit the transaction; if False, only flush it. Defaults to True.
 
     Returns:
         models.Habit: Created habit object.
@@ -22,11 +47,23 @@ def create_habit(db: Session, habit: schemas.HabitCreate, user_id: int):
     db_habit = models.Habit(
         **habit.dict(), owner_id=user_id)  # Create SQLAlchemy model object
     db.add(db_habit)  # Add to session
-    db.commit()  # Commit transaction to database
+    db.flush()  # Assign the habit ID
+    refresh_habit_status(db, db_habit)  # Precompute the (empty) streak and broken flag
+    bump_versions(db, user_id)  # The user's habit list changed
+    publish_invalidation(db, user_id, db_habit.id)  # The user's analytics now include this habit
+    _commit_or_flush(db, commit)
     db.refresh(db_habit)  # Refresh object to get updated data from database
     return db_habit  # Return created habit object
 
 
+def _commit_or_flush(db: Session, commit: bool):
+    """Commit the transaction, or only flush it when the caller commits several changes at once."""
+    if commit:
+        db.commit()  # Commit transaction
+    else:
+        db.flush()  # Send the changes, leave the commit to the caller
+
+
 def get_habit(db: Session, habit_id: int):
     """
     Retrieve a habit by its ID.
@@ -38,7 +75,8 @@ def get_habit(db: Session, habit_id: int):
     Returns:
         models.Habit: Habit object if found, otherwise None.
     """
-    return db.query(models.Habit).filter(models.Habit.id == habit_id).first()  # Query habit by ID
+    return db.query(models.Habit).filter(
+        models.Habit.id == habit_id, models.Habit.deleted_at.is_(None)).first()  # Query habit by ID, skipping deleted habits
 
 
 def get_habits(db: Session, user_id: int):
@@ -52,33 +90,57 @@ def get_habits(db: Session, user_id: int):
     Returns:
         List[models.Habit]: List of habit objects.
     """
-    return db.query(models.Habit).filter(models.Habit.owner_id == user_id).all()  # Query habits by user ID
+    return db.query(models.Habit).filter(
+        models.Habit.owner_id == user_id, models.Habit.deleted_at.is_(None)).all()  # Query habits by user ID
+
+
+def get_habit_rows(db: Session, user_id: int, periodicity: str = None):
+    """
+    Retrieve the habits of a user as plain column rows.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): User ID whose habits to retrieve.
+        periodicity (str, optional): Only return habits with this periodicity.
+
+    Returns:
+        List[Row]: Rows ordered as HABIT_ROW_FIELDS.
+    """
+    query = db.query(*(getattr(models.Habit, field) for field in HABIT_ROW_FIELDS)).filter(
+        models.Habit.owner_id == user_id, models.Habit.deleted_at.is_(None))  # Select columns only, no ORM objects
+    if periodicity is not None:
+        query = query.filter(models.Habit.periodicity == periodicity)  # Filter in SQL instead of Python
+    return query.all()
 
 
-def update_habit(db: Session, habit: schemas.HabitUpdate, habit_id: int):
+def update_habit(db: Session, habit: schemas.HabitUpdate, habit_id: int, commit: bool = True):
     """
-    Update an existing habit with new data.
+    Update an existing habit with new data. Fields set to None are left unchanged.
 
     Args:
         db (Session): SQLAlchemy database session.
         habit (schemas.HabitUpdate): New habit data.
         habit_id (int): ID of the habit to update.
+        commit (bool, optional): Commit the transaction; if False, only flush it. Defaults to True.
 
     Returns:
         models.Habit: Updated habit object if found, otherwise None.
     """
-    db_habit = db.query(models.Habit).filter(
-        models.Habit.id == habit_id).first()  # Query habit by ID
+    db_habit = get_habit(db, habit_id)  # Query habit by ID
     if not db_habit:
         return None  # Return None if habit not found
-    for key, value in habit.dict().items():
+    for key, value in habit.dict(exclude_none=True).items():
         setattr(db_habit, key, value)  # Update habit attributes
-    db.commit()  # Commit transaction
+    db.flush()  # Make the new periodicity visible to the streak queries
+    refresh_habit_status(db, db_habit)  # Periodicity changes affect streaks
+    bump_versions(db, db_habit.owner_id, db_habit)  # Habit and habit list changed
+    publish_invalidation(db, db_habit.owner_id, habit_id)  # Periodicity changes affect streaks
+    _commit_or_flush(db, commit)
     db.refresh(db_habit)  # Refresh habit object
     return db_habit  # Return updated habit object
 
 
-def checkoff_habit(db: Session, habit_id: int, user_id: int):
+def checkoff_habit(db: Session, habit_id: int, user_id: int, commit: bool = True):
     """
     Record a check-off event for a habit.
 
@@ -86,39 +148,54 @@ def checkoff_habit(db: Session, habit_id: int, user_id: int):
         db (Session): SQLAlchemy database session.
         habit_id (int): ID of the habit to check off.
         user_id (int): ID of the user checking off the habit.
+        commit (bool, optional): Commit the transaction; if False, only flush it. Defaults to True.
 
     Returns:
         models.Habit: Habit object if found and event recorded, otherwise None.
     """
-    db_habit = db.query(models.Habit).filter(
-        models.Habit.id == habit_id).first()  # Query habit by ID
+    db_habit = get_habit(db, habit_id)  # Query habit by ID
     if not db_habit or db_habit.owner_id != user_id:
         return None  # Return None if habit not found or does not belong to the user
+    timestamp = datetime.utcnow()
     db_event = models.HabitEvent(
-        habit_id=habit_id, timestamp=datetime.utcnow())  # Create new habit event
+        habit_id=habit_id, timestamp=timestamp,
+        local_day=local_day(timestamp, db_habit.owner.timezone))  # Create new habit event on the owner's local day
     db.add(db_event)  # Add event to session
-    db.commit()  # Commit transaction
+    db.flush()  # Make the event visible to the streak queries
+    previous_status = (db_habit.streak, db_habit.is_broken)
+    refresh_habit_status(db, db_habit)  # Precompute the streak including this check-off
+    bump_versions(db, user_id, db_habit)  # Events and streak changed
+    publish_invalidation(db, user_id, habit_id)  # Streaks computed before this check-off are stale
+    publish_habit_update(db, user_id, {"type": "checkoff", "habit_id": habit_id, "timestamp": timestamp})
+    publish_status_changes(db, db_habit, previous_status)
+    _commit_or_flush(db, commit)
     db.refresh(db_event)  # Refresh event object
     return db_habit  # Return associated habit object
 
 
-def delete_habit(db: Session, habit_id: int):
+def delete_habit(db: Session, habit_id: int, commit: bool = True):
     """
     Delete a habit by its ID.
 
+    The habit is only marked as deleted, which hides it from every query at once; its
+    events and the habit row are removed in the background by `purge_deleted_habits`.
+
     Args:
         db (Session): SQLAlchemy database session.
         habit_id (int): ID of the habit to delete.
+        commit (bool, optional): Commit the transaction; if False, only flush it. Defaults to True.
 
     Returns:
         models.Habit: Deleted habit object if found, otherwise None.
     """
-    db_habit = db.query(models.Habit).filter(
-        models.Habit.id == habit_id).first()  # Query habit by ID
+    db_habit = get_habit(db, habit_id)  # Query habit by ID
     if not db_habit:
         return None  # Return None if habit not found
-    db.delete(db_habit)  # Delete habit
-    db.commit()  # Commit transaction
+    publish_invalidation(db, db_habit.owner_id, habit_id)  # Results of the deleted habit are stale
+    bump_versions(db, db_habit.owner_id)  # The user's habit list changed
+    db_habit.deleted_at = datetime.utcnow()  # Soft delete, purged in the background
+    db_habit.next_due_at = None  # Leave the due-habits queue
+    _commit_or_flush(db, commit)
     return db_habit  # Return deleted habit object
 
 
@@ -134,8 +211,19 @@ def create_habit_event(db: Session, habit_event: schemas.HabitEventCreate):
         models.HabitEvent: Created habit event object.
     """
     db_event = models.HabitEvent(
-        **habit_event.dict())  # Create SQLAlchemy model object
+        **habit_event.dict(), timestamp=datetime.utcnow())  # Create SQLAlchemy model object
     db.add(db_event)  # Add event to session
+    db_habit = get_habit(db, db_event.habit_id)  # Habit the event belongs to
+    if db_habit:
+        db_event.local_day = local_day(db_event.timestamp, db_habit.owner.timezone)  # Owner's local day
+        db.flush()  # Make the event visible to the streak queries
+        previous_status = (db_habit.streak, db_habit.is_broken)
+        refresh_habit_status(db, db_habit)  # Precompute the streak including this event
+        bump_versions(db, db_habit.owner_id, db_habit)  # Events and streak changed
+        publish_invalidation(db, db_habit.owner_id, db_event.habit_id)  # Streaks computed before this event are stale
+        publish_habit_update(db, db_habit.owner_id, {
+            "type": "checkoff", "habit_id": db_event.habit_id, "timestamp": db_event.timestamp})
+        publish_status_changes(db, db_habit, previous_status)
     db.commit()  # Commit transaction
     db.refresh(db_event)  # Refresh event object
     return db_event  # Return created habit event object
@@ -155,69 +243,453 @@ def get_habit_events(db: Session, habit_id: int):
     return db.query(models.HabitEvent).filter(models.HabitEvent.habit_id == habit_id).all()  # Query events by habit ID
 
 
-def get_streak_for_habit(habit_id: int, db: Session):
+def bump_versions(db: Session, user_id: int, db_habit: models.Habit = None):
     """
-    Calculate the current streak (longest consecutive days) for a habit.
+    Increment the version of a changed habit and the aggregate habit version of its owner.
+
+    The increments are evaluated by the database, so concurrent writers never produce the
+    same version twice. They become visible together with the change when it commits.
 
     Args:
-        habit_id (int): ID of the habit to calculate streak for.
         db (Session): SQLAlchemy database session.
+        user_id (int): ID of the user whose habits changed.
+        db_habit (models.Habit, optional): The changed habit, if it still exists.
+    """
+    if db_habit is not None:
+        db_habit.version = models.Habit.version + 1  # Reloaded from the database on next access
+    db.execute(update(models.User).where(models.User.id == user_id).values(
+        habits_version=models.User.habits_version + 1).execution_options(synchronize_session=False))
+
+
+def get_habit_version(db: Session, habit_id: int):
+    """
+    Retrieve the version of a habit with a single primary key lookup.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        habit_id (int): ID of the habit.
 
     Returns:
-        int: Maximum streak of consecutive days the habit was checked off.
+        int: Version of the habit, or None if the habit does not exist or was deleted.
     """
-    events = get_habit_events(db, habit_id)  # Retrieve habit events
-    events.sort(key=lambda x: x.timestamp)  # Sort events by timestamp
+    return db.query(models.Habit.version).filter(models.Habit.id == habit_id, models.Habit.deleted_at.is_(None)).scalar()
 
-    # Initialize variables for streak calculation
-    periodicity = db.query(models.Habit).filter(
-        models.Habit.id == habit_id).first().periodicity
-    streak = 0
-    max_streak = 0
-    last_date = None
 
-    for event in events:
-        if periodicity == 'daily':
-            if last_date and event.timestamp.date() == (last_date + timedelta(days=1)):
-                streak += 1
-            else:
-                streak = 1
-        elif periodicity == 'weekly':
-            if last_date and event.timestamp.date() <= (last_date + timedelta(days=7)):
-                streak += 1
-            else:
-                streak = 1
-        last_date = event.timestamp.date()
-        max_streak = max(max_streak, streak)  # Update max streak
+def get_habits_version(db: Session, user_id: int):
+    """
+    Retrieve the aggregate habit version of a user with a single primary key lookup.
 
-    return max_streak  # Return maximum streak
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): ID of the user.
+
+    Returns:
+        int: Aggregate version of the user's habits, or None if the user does not exist.
+    """
+    return db.query(models.User.habits_version).filter(models.User.id == user_id).scalar()
 
 
-def is_habit_broken(habit_id: int, db: Session):
+def get_dashboard_owner(db: Session, user_id: int):
     """
-    Check if a habit is considered 'broken' based on its periodicity and last event date.
+    Retrieve what the dashboard needs to know about a user with a single primary key lookup.
 
     Args:
-        habit_id (int): ID of the habit to check.
         db (Session): SQLAlchemy database session.
+        user_id (int): ID of the user.
 
     Returns:
-        bool: True if the habit is broken (no recent check-off), False otherwise.
+        Row: (habits_version, timezone) row, or None if the user does not exist.
+    """
+    return db.query(models.User.habits_version, models.User.timezone).filter(models.User.id == user_id).first()
+
+
+def get_dashboard(db: Session, user_id: int, timezone: str):
     """
-    events = get_habit_events(db, habit_id)  # Retrieve habit events
-    if not events:
-        return True  # Return True if no events found
+    Retrieve every habit of a user together with its streaks, broken flag and last check-off.
+
+    Runs exactly two queries whatever the number of habits: one for the habits and their
+    last check-off time, and one streaming the distinct check-off days of all of them,
+    ordered by habit, which are evaluated habit by habit in a single pass.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): ID of the user.
+        timezone (str): Time zone of the user.
 
-    # Determine last event date and current date
-    last_event_date = max(event.timestamp for event in events).date()
-    periodicity = db.query(models.Habit).filter(
-        models.Habit.id == habit_id).first().periodicity
-    current_date = datetime.utcnow().date()
+    Returns:
+        List[dict]: One dict per habit with the DASHBOARD_HABIT_FIELDS and DASHBOARD_STATUS_FIELDS keys.
+    """
+    last_checkoffs = db.query(models.HabitEvent.habit_id, func.max(models.HabitEvent.timestamp).label(
+        "last_checkoff_at")).join(models.Habit, models.HabitEvent.habit_id == models.Habit.id).filter(
+        models.Habit.owner_id == user_id, models.Habit.deleted_at.is_(None)).group_by(
+        models.HabitEvent.habit_id).subquery()  # Only this user's events
+    habits = db.query(*(getattr(models.Habit, field) for field in DASHBOARD_HABIT_FIELDS),
+                      last_checkoffs.c.last_checkoff_at).outerjoin(
+        last_checkoffs, last_checkoffs.c.habit_id == models.Habit.id).filter(
+        models.Habit.owner_id == user_id, models.Habit.deleted_at.is_(None)).order_by(models.Habit.id).all()
+
+    days = db.execute(select(models.HabitEvent.habit_id, models.HabitEvent.local_day).join(
+        models.Habit, models.HabitEvent.habit_id == models.Habit.id).where(
+        models.Habit.owner_id == user_id, models.Habit.deleted_at.is_(None), models.HabitEvent.local_day.is_not(None)).distinct().order_by(
+        models.HabitEvent.habit_id, models.HabitEvent.local_day).execution_options(yield_per=DAY_STREAM_BATCH_SIZE))
+    days_by_habit = groupby(days, key=lambda row: row.habit_id)
+    today = local_today(timezone).toordinal()
+
+    dashboard = []
+    habit_days = next(days_by_habit, None)
+    for habit in habits:
+        rule = habit_rule(habit.periodicity)
+        history = ()
+        while habit_days is not None and habit_days[0] <= habit.id:  # Both streams are ordered by habit ID
+            if habit_days[0] == habit.id:
+                history = [row.local_day.toordinal() for row in habit_days[1]]
+            habit_days = next(days_by_habit, None)
+        summary = rule.evaluate(history)
+        entry = dict(zip(DASHBOARD_HABIT_FIELDS, habit))
+        entry.update(zip(DASHBOARD_STATUS_FIELDS, (
+            rule.current_streak(summary, today), summary.longest, rule.is_broken(summary, today),
+            habit.last_checkoff_at)))
+        dashboard.append(entry)
+    return dashboard
+
+
+def get_row_counts(db: Session):
+    """
+    Count the users, habits and events stored in one database.
 
-    # Check if habit is broken based on periodicity
-    if periodicity == 'daily' and (current_date - last_event_date).days > 1:
-        return True
-    if periodicity == 'weekly' and (current_date - last_event_date).days > 7:
-        return True
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        dict: Numbers of users, live habits, soft-deleted habits and events.
+    """
+    habits = db.execute(select(func.count(models.Habit.id), func.count(models.Habit.deleted_at))).one()
+    return {
+        "users": db.execute(select(func.count(models.User.id))).scalar(),
+        "habits": habits[0] - habits[1],
+        "deleted_habits": habits[1],
+        "events": db.execute(select(func.count(models.HabitEvent.id))).scalar(),
+    }
+
+
+def get_habit_event_rows(db: Session, habit_id: int):
+    """
+    Retrieve the events of a habit as plain column rows.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        habit_id (int): ID of the habit whose events to retrieve.
+
+    Returns:
+        List[Row]: Rows ordered as HABIT_EVENT_ROW_FIELDS; none if the habit was deleted.
+    """
+    return db.query(*(getattr(models.HabitEvent, field) for field in HABIT_EVENT_ROW_FIELDS)).join(
+        models.Habit, models.HabitEvent.habit_id == models.Habit.id).filter(
+        models.HabitEvent.habit_id == habit_id, models.Habit.deleted_at.is_(None)).all()  # Select columns only, no ORM objects
+
+
+def compute_habit_status(db: Session, db_habit: models.Habit, today=None):
+    """
+    Compute the precomputed streak, broken flag and deadline of a habit from its history.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        db_habit (models.Habit): Habit to evaluate.
+        today (date, optional): Day the values are computed for. Defaults to the owner's local day.
+
+    Returns:
+        dict: Values of the streak, is_broken, status_day and next_due_at columns.
+    """
+    owner_timezone = db_habit.owner.timezone
+    today = today or local_today(owner_timezone)
+    rule, summary = evaluate_habit(db, db_habit.id, db_habit.periodicity)  # One pass over the history
+    return {
+        "streak": summary.longest,
+        "is_broken": rule.is_broken(summary, today.toordinal()),
+        "status_day": today,  # Day the values are valid for
+        "next_due_at": compute_next_due_at(summary, db_habit.created_at, owner_timezone),  # Deadline for the due queue
+    }
+
+
+def refresh_habit_status(db: Session, db_habit: models.Habit, today=None):
+    """
+    Recompute and store the precomputed streak, broken flag and deadline of a habit.
+
+    The values come from a single evaluation of the habit's history and are written to
+    the habit without committing, so they become visible together with the change that
+    caused the recomputation.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        db_habit (models.Habit): Habit to refresh.
+        today (date, optional): Day the values are computed for. Defaults to the owner's local day.
+
+    Returns:
+        models.Habit: The refreshed habit object.
+    """
+    for field, value in compute_habit_status(db, db_habit, today).items():
+        setattr(db_habit, field, value)
+    return db_habit
+
+
+def refresh_unchanged_habit_status(db: Session, db_habit: models.Habit, today=None):
+    """
+    Recompute the precomputed status of a habit outside of any change to it, such as after a day rollover.
+
+    The values are written with an UPDATE conditional on the version the habit was loaded
+    with. A check-off committed in the meantime bumps the version and stores values that
+    include it, so they are never overwritten with values computed from the older history.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        db_habit (models.Habit): Habit to refresh, as loaded from the database.
+        today (date, optional): Day the values are computed for. Defaults to the owner's local day.
+
+    Returns:
+        bool: True if the values were written, False if the habit changed since it was loaded.
+    """
+    values = compute_habit_status(db, db_habit, today)
+    updated = db.execute(update(models.Habit).where(
+        models.Habit.id == db_habit.id, models.Habit.version == db_habit.version).values(**values).execution_options(
+        synchronize_session=False)).rowcount
+    if updated:
+        for field, value in values.items():
+            set_committed_value(db_habit, field, value)  # Already written, not a pending change
+    return bool(updated)
+
+
+def publish_status_changes(db: Session, db_habit: models.Habit, previous_status):
+    """
+    Push the streak and broken state of a refreshed habit to its owner's live streams, if they changed.
+
+    Args:
+        db (Session): SQLAlchemy database session holding the change.
+        db_habit (models.Habit): Habit refreshed by refresh_habit_status.
+        previous_status (Tuple[int, bool]): Streak and broken flag before the refresh.
+    """
+    previous_streak, previous_is_broken = previous_status
+    if db_habit.streak != previous_streak:
+        publish_habit_update(db, db_habit.owner_id, {"type": "streak", "habit_id": db_habit.id, "streak": db_habit.streak})
+    if db_habit.is_broken != previous_is_broken:
+        publish_habit_update(db, db_habit.owner_id, {
+            "type": "broken", "habit_id": db_habit.id, "is_broken": db_habit.is_broken})
+
+
+def compute_next_due_at(summary: StreakSummary, created_at: datetime, timezone: str):
+    """
+    Compute the moment a habit becomes broken unless it is checked off again.
 
-    return False  # Return False if habit is not broken
+    Args:
+        summary (StreakSummary): Evaluated history of the habit.
+        created_at (datetime): Creation time of the habit.
+        timezone (str): Time zone of the habit's owner.
+
+    Returns:
+        datetime: UTC deadline (local midnight of the deadline day); a habit without
+            check-offs is due since its creation.
+    """
+    if summary.deadline is None:
+        return created_at  # Never checked off, due since creation
+    return local_midnight_utc(date.fromordinal(summary.deadline), timezone)
+
+
+def get_due_habits(db: Session, start: datetime, end: datetime, cursor=None, limit: int = 100):
+    """
+    Retrieve one page of habits, across all users, whose deadline falls in a time window.
+
+    Pages are ordered by (next_due_at, id) and continue after the given cursor, so every
+    page is a single range scan of the next_due_at index.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        start (datetime): Inclusive lower bound of the deadline.
+        end (datetime): Exclusive upper bound of the deadline.
+        cursor (Tuple[datetime, int], optional): (next_due_at, id) of the last habit of the previous page.
+        limit (int, optional): Maximum number of habits to return. Defaults to 100.
+
+    Returns:
+        List[Row]: Rows ordered as DUE_HABIT_FIELDS.
+    """
+    query = db.query(*(getattr(models.Habit, field) for field in DUE_HABIT_FIELDS)).filter(
+        models.Habit.next_due_at >= start, models.Habit.next_due_at < end)
+    if cursor is not None:
+        query = query.filter(tuple_(models.Habit.next_due_at, models.Habit.id) > tuple_(*cursor))  # Keyset pagination
+    return query.order_by(models.Habit.next_due_at, models.Habit.id).limit(limit).all()
+
+
+def iter_due_habits(db: Session, start: datetime, end: datetime, batch_size: int = 500):
+    """
+    Iterate over every habit whose deadline falls in a time window, one page at a time.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        start (datetime): Inclusive lower bound of the deadline.
+        end (datetime): Exclusive upper bound of the deadline.
+        batch_size (int, optional): Number of habits fetched per query. Defaults to 500.
+
+    Yields:
+        Row: Rows ordered as DUE_HABIT_FIELDS.
+    """
+    cursor = None
+    while True:
+        page = get_due_habits(db, start, end, cursor=cursor, limit=batch_size)
+        yield from page
+        if len(page) < batch_size:
+            return
+        cursor = (page[-1].next_due_at, page[-1].id)
+
+
+def _get_fresh_status(db: Session, habit_id: int):
+    """
+    Retrieve the precomputed status of a habit if it was computed today.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        habit_id (int): ID of the habit to look up.
+
+    Returns:
+        Row: (streak, is_broken) row, or None if missing or computed on an earlier local day.
+    """
+    row = db.query(models.Habit.streak, models.Habit.is_broken, models.Habit.status_day, models.User.timezone).join(
+        models.Habit.owner).filter(models.Habit.id == habit_id, models.Habit.deleted_at.is_(None)).first()  # Single primary key lookup
+    if row is None or row.status_day != local_today(row.timezone):
+        return None
+    return row
+
+
+def get_current_streak(db: Session, habit_id: int):
+    """
+    Retrieve the streak of a habit, served from the precomputed value when it is current.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        habit_id (int): ID of the habit.
+
+    Returns:
+        int: Streak of the habit, as returned by get_streak_for_habit.
+    """
+    status = _get_fresh_status(db, habit_id)
+    return status.streak if status else get_streak_for_habit(habit_id, db)
+
+
+def get_current_is_broken(db: Session, habit_id: int):
+    """
+    Retrieve the broken flag of a habit, served from the precomputed value when it is current.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        habit_id (int): ID of the habit.
+
+    Returns:
+        bool: Broken flag of the habit, as returned by is_habit_broken.
+    """
+    status = _get_fresh_status(db, habit_id)
+    return status.is_broken if status else is_habit_broken(habit_id, db)
+
+
+def get_habit_days(db: Session, habit_id: int, since=None):
+    """
+    Stream the distinct local days on which a habit was checked off.
+
+    The days are read from the indexed local_day column, de-duplicated and ordered by
+    the database and fetched as scalars in batches, without loading HabitEvent objects.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        habit_id (int): ID of the habit whose event days to retrieve.
+        since (date, optional): Only return days from this one onwards.
+
+    Returns:
+        Iterator[date]: Distinct event days in ascending order.
+    """
+    query = select(models.HabitEvent.local_day).where(models.HabitEvent.habit_id == habit_id)
+    if since is not None:
+        query = query.where(models.HabitEvent.local_day >= since)  # Index range scan
+    query = query.distinct().order_by(models.HabitEvent.local_day)
+    return db.execute(query.execution_options(yield_per=DAY_STREAM_BATCH_SIZE)).scalars()
+
+
+def backfill_event_local_days(db: Session, batch_size: int = LOCAL_DAY_BACKFILL_BATCH_SIZE):
+    """
+    Fill in the local day of events recorded before local days were stored.
+
+    Events are updated in committed batches, using the time zone of each habit's owner.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        batch_size (int, optional): Number of events per batch. Defaults to LOCAL_DAY_BACKFILL_BATCH_SIZE.
+
+    Returns:
+        int: Number of events updated.
+    """
+    updated = 0
+    while True:
+        rows = db.query(models.HabitEvent.id, models.HabitEvent.timestamp, models.User.timezone).join(
+            models.Habit, models.HabitEvent.habit_id == models.Habit.id).join(models.Habit.owner).filter(
+            models.HabitEvent.local_day.is_(None)).limit(batch_size).all()
+        if not rows:
+            return updated
+        db.bulk_update_mappings(models.HabitEvent, [
+            {"id": row.id, "local_day": local_day(row.timestamp, row.timezone)} for row in rows
+        ])
+        db.commit()  # Commit the batch
+        updated += len(rows)
+
+
+def evaluate_habit(db: Session, habit_id: int, periodicity: str, since=None):
+    """
+    Evaluate the history of a habit against its periodicity rule in a single pass.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        habit_id (int): ID of the habit to evaluate.
+        periodicity (str): Periodicity of the habit.
+        since (date, optional): Only evaluate check-offs from this day onwards.
+
+    Returns:
+        Tuple[PeriodicityRule, StreakSummary]: The compiled rule and the evaluated history.
+    """
+    rule = habit_rule(periodicity)  # Compiled once per periodicity string
+    return rule, rule.evaluate(day.toordinal() for day in get_habit_days(db, habit_id, since=since))
+
+
+def get_streak_for_habit(habit_id: int, db: Session):
+    """
+    Calculate the current streak (longest consecutive periods) for a habit.
+
+    Args:
+        habit_id (int): ID of the habit to calculate streak for.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        int: Maximum streak of consecutive periods the habit was checked off.
+    """
+    periodicity = db.query(models.Habit.periodicity).filter(
+        models.Habit.id == habit_id, models.Habit.deleted_at.is_(None)).scalar()
+    if periodicity is None:
+        return 0  # Unknown habit, no streak
+    return evaluate_habit(db, habit_id, periodicity)[1].longest  # Longest streak of the history
+
+
+def is_habit_broken(habit_id: int, db: Session):
+    """
+    Check if a habit is considered 'broken' based on its periodicity and recent check-offs.
+
+    Only the check-offs that can still affect the result are read from the database,
+    and days are counted in the time zone of the habit's owner.
+
+    Args:
+        habit_id (int): ID of the habit to check.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        bool: True if the habit is broken (no recent check-off), False otherwise.
+    """
+    habit = db.query(models.Habit.periodicity, models.User.timezone).join(models.Habit.owner).filter(
+        models.Habit.id == habit_id, models.Habit.deleted_at.is_(None)).first()
+    if habit is None:
+        return True  # Unknown habit, nothing checked off
+    today = local_today(habit.timezone).toordinal()
+    rule = habit_rule(habit.periodicity)
+    _, summary = evaluate_habit(db, habit_id, habit.periodicity, since=date.fromordinal(rule.history_start(today)))
+    return rule.is_broken(summary, today)
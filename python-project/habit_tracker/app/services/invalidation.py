@@ -0,0 +1,139 @@
+# habit_tracker/app/services/invalidation.py
+
+import asyncio
+import logging
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app import database
+from app.services.pubsub import HABIT_UPDATES_CHANNEL, apply_habit_update, habit_update_broker
+from app.utils.cache import analytics_cache
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel carrying "<user_id>:<habit_id>" invalidation messages
+INVALIDATION_CHANNEL = "habit_cache_invalidation"
+# Seconds to wait before re-establishing a lost listener connection
+RECONNECT_DELAY = 5
+
+# Session.info key holding the changes made in the current transaction
+_PENDING_CHANGES = "pending_invalidations"
+
+
+def publish_invalidation(db: Session, user_id: int, habit_id: int):
+    """
+    Announce that cached results for a user's habit are stale.
+
+    On PostgreSQL a NOTIFY is issued inside the current transaction, so every listening
+    worker on every node receives it exactly when the change commits. The change is also
+    remembered on the session and evicted from the local cache after commit, so the
+    writer never serves stale results while the notification is in flight.
+
+    Args:
+        db (Session): SQLAlchemy database session holding the change.
+        user_id (int): ID of the user owning the habit.
+        habit_id (int): ID of the changed habit.
+    """
+    db.info.setdefault(_PENDING_CHANGES, set()).add((user_id, habit_id))
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_notify(INVALIDATION_CHANNEL, f"{user_id}:{habit_id}")))
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_changes(session: Session):
+    for user_id, habit_id in session.info.pop(_PENDING_CHANGES, ()):
+        analytics_cache.invalidate(user_id=user_id, habit_id=habit_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session: Session):
+    session.info.pop(_PENDING_CHANGES, None)
+
+
+def apply_invalidation(payload: str):
+    """
+    Evict the cache entries named by an invalidation message.
+
+    Args:
+        payload (str): Message of the form "<user_id>:<habit_id>".
+    """
+    try:
+        user_id, habit_id = (int(part) for part in payload.split(":"))
+    except ValueError:
+        logger.warning("Ignoring malformed invalidation message %r", payload)
+        return
+    analytics_cache.invalidate(user_id=user_id, habit_id=habit_id)
+
+
+def _open_listener_connection(engine):
+    """Open a dedicated autocommit connection subscribed to the invalidation and habit update channels."""
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    connection = engine.dialect.connect(*cargs, **cparams)  # Kept outside the pool for its whole life
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+        cursor.execute(f"LISTEN {HABIT_UPDATES_CHANNEL}")
+    return connection
+
+
+async def listen_for_invalidations(engine=database.engine):
+    """
+    Background task evicting cache entries announced by other workers and nodes, and
+    relaying their habit updates to this worker's live streams.
+
+    The listener connection is watched by the event loop, so idle waiting costs no thread.
+    If the connection drops, it is re-established, the local cache is cleared and live
+    streams are told to resynchronize, since messages sent in the meantime were lost.
+
+    Args:
+        engine (Engine, optional): Engine to listen on. Defaults to the application engine.
+    """
+    loop = asyncio.get_running_loop()
+    reconnecting = False
+    while True:
+        try:
+            connection = await loop.run_in_executor(None, _open_listener_connection, engine)
+        except Exception:
+            logger.exception("Could not start the cache invalidation listener")
+            await asyncio.sleep(RECONNECT_DELAY)
+            continue
+        if reconnecting:
+            analytics_cache.clear()  # Messages may have been missed while disconnected
+            habit_update_broker.broadcast({"type": "resync"})  # Live streams may have missed updates too
+
+        readable = asyncio.Event()
+        fileno = connection.fileno()
+        loop.add_reader(fileno, readable.set)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    if notify.channel == HABIT_UPDATES_CHANNEL:
+                        apply_habit_update(notify.payload)  # Relay to this worker's live streams
+                    else:
+                        apply_invalidation(notify.payload)
+        except Exception:
+            logger.exception("Cache invalidation listener failed, reconnecting")
+        finally:
+            loop.remove_reader(fileno)
+            connection.close()
+        reconnecting = True
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+def start_invalidation_listener(engine=database.engine):
+    """
+    Start the invalidation listener if the database supports LISTEN/NOTIFY.
+
+    Args:
+        engine (Engine, optional): Engine to listen on. Defaults to the application engine.
+
+    Returns:
+        asyncio.Task: The listener task, or None when the database is not PostgreSQL.
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    return asyncio.create_task(listen_for_invalidations(engine))
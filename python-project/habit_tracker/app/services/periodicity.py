@@ -0,0 +1,301 @@
+# habit_tracker/app/services/periodicity.py
+
+"""
+Periodicity rules for habits.
+
+A habit's periodicity string is compiled once into a rule object, cached by string,
+that evaluates a habit's history in a single pass over its sorted, distinct check-off
+days given as day numbers (`date.toordinal()`). Supported rules:
+
+- ``daily``: a check-off every day.
+- ``weekly``: check-offs at most seven days apart.
+- ``every <n> days``: check-offs at most n days apart.
+- ``<n> times per week``: at least n check-off days in every calendar week (Monday to Sunday).
+- ``monthly``: a check-off in every calendar month.
+- ``on <weekday>[, <weekday>...]``: a check-off on each listed weekday, e.g. ``on mon, wed, fri``.
+
+New periodicities are validated with `compile_periodicity`. Stored habits are read with
+`habit_rule`, which evaluates unsupported legacy strings as a rule that never builds a
+streak instead of failing.
+"""
+
+import logging
+import re
+from abc import ABC, abstractmethod
+from datetime import date
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+_EVERY_N_DAYS = re.compile(r"every (\d+) days?")
+_TIMES_PER_WEEK = re.compile(r"(\d+) times? (?:per|a) week")
+_ON_WEEKDAYS = re.compile(r"on ([a-z, ]+)")
+
+
+class StreakSummary(NamedTuple):
+    """
+    Result of evaluating a habit's history against its periodicity rule.
+
+    Attributes:
+        longest (int): Longest streak, in periods.
+        current (int): Length of the most recent streak, in periods.
+        deadline (int, optional): Day number on which the habit becomes broken unless
+            checked off again, or None if it has never been checked off.
+    """
+    longest: int
+    current: int
+    deadline: Optional[int]
+
+
+class PeriodicityRule(ABC):
+    """
+    Base class of compiled periodicity rules.
+
+    Attributes:
+        rule (str): Normalized rule string the rule was compiled from.
+    """
+
+    def __init__(self, rule: str):
+        self.rule = rule
+
+    @abstractmethod
+    def evaluate(self, days: Iterable[int]) -> StreakSummary:
+        """
+        Evaluate a history in one pass.
+
+        Args:
+            days (Iterable[int]): Distinct check-off day numbers in ascending order.
+
+        Returns:
+            StreakSummary: Streaks and deadline of the history.
+        """
+
+    @abstractmethod
+    def history_start(self, today: int) -> int:
+        """
+        First day whose check-offs can affect whether the habit is broken today.
+
+        Evaluating only the days from this one onwards gives the same `is_broken` result
+        as evaluating the whole history.
+
+        Args:
+            today (int): Current day number.
+
+        Returns:
+            int: Day number.
+        """
+
+    def is_broken(self, summary: StreakSummary, today: int) -> bool:
+        """
+        Whether the habit is broken on the given day.
+
+        Args:
+            summary (StreakSummary): Evaluated history.
+            today (int): Current day number.
+
+        Returns:
+            bool: True if the habit has no check-offs or its deadline has passed.
+        """
+        return summary.deadline is None or today >= summary.deadline
+
+    def current_streak(self, summary: StreakSummary, today: int) -> int:
+        """
+        Length of the streak still alive on the given day.
+
+        Args:
+            summary (StreakSummary): Evaluated history.
+            today (int): Current day number.
+
+        Returns:
+            int: The most recent streak, or 0 if the habit is broken.
+        """
+        return 0 if self.is_broken(summary, today) else summary.current
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.rule!r})"
+
+
+class EveryNDaysRule(PeriodicityRule):
+    """Check-offs at most `interval` days apart; `daily` and `weekly` are intervals of 1 and 7."""
+
+    def __init__(self, rule: str, interval: int):
+        super().__init__(rule)
+        self.interval = interval
+
+    def evaluate(self, days):
+        interval = self.interval
+        longest = streak = 0
+        last = None
+        for day in days:
+            streak = streak + 1 if last is not None and day - last <= interval else 1
+            if streak > longest:
+                longest = streak
+            last = day
+        return StreakSummary(longest, streak, None if last is None else last + interval + 1)
+
+    def history_start(self, today):
+        return today - self.interval
+
+
+class TimesPerWeekRule(PeriodicityRule):
+    """At least `times` check-off days in each calendar week, counted over consecutive weeks."""
+
+    def __init__(self, rule: str, times: int):
+        super().__init__(rule)
+        self.times = times
+
+    def evaluate(self, days):
+        times = self.times
+        longest = streak = 0
+        last_qualified = None  # Week index of the latest qualifying week
+        week = None
+        count = 0
+        for day in days:
+            day_week = (day - 1) // 7  # Day number 1 is a Monday
+            if day_week != week:
+                if count >= times:
+                    streak = streak + 1 if last_qualified == week - 1 else 1
+                    longest = max(longest, streak)
+                    last_qualified = week
+                week, count = day_week, 0
+            count += 1
+        if count >= times:
+            streak = streak + 1 if last_qualified == week - 1 else 1
+            longest = max(longest, streak)
+            last_qualified = week
+        if last_qualified is None:
+            return StreakSummary(0, 0, None)
+        return StreakSummary(longest, streak, (last_qualified + 2) * 7 + 1)  # Monday after the following week
+
+    def history_start(self, today):
+        return ((today - 1) // 7 - 1) * 7 + 1  # Monday of the previous week
+
+
+class MonthlyRule(PeriodicityRule):
+    """A check-off in each calendar month."""
+
+    def evaluate(self, days):
+        longest = streak = 0
+        last_month = None
+        month_end = 0  # First day number after the month of the previous check-off
+        for day in days:
+            if day < month_end:
+                continue  # Same month as the previous check-off
+            current = date.fromordinal(day)
+            month = current.year * 12 + current.month - 1
+            month_end = _month_start(month + 1)
+            streak = streak + 1 if last_month == month - 1 else 1
+            longest = max(longest, streak)
+            last_month = month
+        if last_month is None:
+            return StreakSummary(0, 0, None)
+        return StreakSummary(longest, streak, _month_start(last_month + 2))
+
+    def history_start(self, today):
+        current = date.fromordinal(today)
+        return _month_start(current.year * 12 + current.month - 2)  # First day of the previous month
+
+
+class WeekdaysRule(PeriodicityRule):
+    """A check-off on each scheduled weekday; check-offs on other days are ignored."""
+
+    def __init__(self, rule: str, weekdays):
+        super().__init__(rule)
+        self.scheduled = tuple(weekday in weekdays for weekday in range(7))
+        # Days back to the previous, and forward to the next, scheduled weekday, by weekday
+        self.previous_gap = tuple(
+            next(gap for gap in range(1, 8) if self.scheduled[(weekday - gap) % 7]) for weekday in range(7))
+        self.next_gap = tuple(
+            next(gap for gap in range(1, 8) if self.scheduled[(weekday + gap) % 7]) for weekday in range(7))
+
+    def evaluate(self, days):
+        scheduled, previous_gap = self.scheduled, self.previous_gap
+        longest = streak = 0
+        last = None
+        for day in days:
+            weekday = (day - 1) % 7
+            if not scheduled[weekday]:
+                continue
+            streak = streak + 1 if last is not None and day - previous_gap[weekday] == last else 1
+            longest = max(longest, streak)
+            last = day
+        if last is None:
+            return StreakSummary(0, 0, None)
+        return StreakSummary(longest, streak, last + self.next_gap[(last - 1) % 7] + 1)
+
+    def history_start(self, today):
+        return today - self.previous_gap[(today - 1) % 7]
+
+
+def _month_start(month: int) -> int:
+    """Day number of the first day of a month given as year * 12 + month - 1."""
+    return date(month // 12, month % 12 + 1, 1).toordinal()
+
+
+@lru_cache(maxsize=256)
+def compile_periodicity(periodicity: str) -> PeriodicityRule:
+    """
+    Compile a periodicity string into a rule, caching the result by string.
+
+    Args:
+        periodicity (str): Periodicity of a habit, e.g. "daily" or "3 times per week".
+
+    Returns:
+        PeriodicityRule: The compiled rule.
+
+    Raises:
+        ValueError: If the periodicity is not supported.
+    """
+    rule = " ".join(str(periodicity).lower().split())
+    if rule == "daily":
+        return EveryNDaysRule(rule, 1)
+    if rule == "weekly":
+        return EveryNDaysRule(rule, 7)
+    if rule == "monthly":
+        return MonthlyRule(rule)
+    match = _EVERY_N_DAYS.fullmatch(rule)
+    if match and int(match.group(1)) >= 1:
+        return EveryNDaysRule(rule, int(match.group(1)))
+    match = _TIMES_PER_WEEK.fullmatch(rule)
+    if match and 1 <= int(match.group(1)) <= 7:
+        return TimesPerWeekRule(rule, int(match.group(1)))
+    match = _ON_WEEKDAYS.fullmatch(rule)
+    if match:
+        names = [name.strip()[:3] for name in match.group(1).split(",")]
+        if names and all(name in WEEKDAYS for name in names):
+            return WeekdaysRule(rule, {WEEKDAYS.index(name) for name in names})
+    raise ValueError(f"Unsupported periodicity: {periodicity!r}")
+
+
+class UnsupportedRule(PeriodicityRule):
+    """Rule of a stored periodicity that is not supported: the habit never builds a streak and is always broken."""
+
+    def evaluate(self, days):
+        return StreakSummary(0, 0, None)
+
+    def history_start(self, today):
+        return today
+
+
+@lru_cache(maxsize=256)
+def habit_rule(periodicity: str) -> PeriodicityRule:
+    """
+    Rule of a stored habit, caching the result by string.
+
+    Habits stored before periodicities were validated may hold strings the rule engine does
+    not support; they are logged once and evaluated with UnsupportedRule.
+
+    Args:
+        periodicity (str): Periodicity column of a habit.
+
+    Returns:
+        PeriodicityRule: The compiled rule, or an UnsupportedRule.
+    """
+    try:
+        return compile_periodicity(periodicity)
+    except ValueError:
+        logger.warning("Unsupported periodicity %r stored for a habit, evaluated as never building a streak", periodicity)
+        return UnsupportedRule(" ".join(str(periodicity).lower().split()))
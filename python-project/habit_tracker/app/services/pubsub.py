@@ -0,0 +1,164 @@
+# habit_tracker/app/services/pubsub.py
+
+import asyncio
+import logging
+import os
+
+import orjson
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel carrying habit update events as JSON, relayed to every worker's subscribers
+HABIT_UPDATES_CHANNEL = "habit_updates"
+# Maximum number of undelivered events per connection before it is told to resynchronize
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+
+# Session.info key holding the events published in the current transaction
+_PENDING_EVENTS = "pending_habit_updates"
+
+
+def format_event(update: dict) -> bytes:
+    """
+    Encode a habit update as a server-sent event.
+
+    Args:
+        update (dict): Update with a "type" key, e.g. {"type": "checkoff", "habit_id": 1, ...}.
+
+    Returns:
+        bytes: The event, ready to be written to the stream.
+    """
+    return b"event: " + update["type"].encode() + b"\ndata: " + orjson.dumps(update) + b"\n\n"
+
+
+class HabitUpdateBroker:
+    """
+    In-process fan-out of habit updates to the streams of connected users.
+
+    Each connection is a bounded asyncio queue registered under its user ID; an idle
+    connection costs a queue and a suspended coroutine, no thread or polling. Updates
+    are encoded once and delivered on the event loop, whichever thread publishes them.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = {}  # user ID -> set of queues
+        self._loop = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """
+        Register a connection of a user. Must be called on the event loop.
+
+        Args:
+            user_id (int): ID of the connected user.
+
+        Returns:
+            asyncio.Queue: Queue receiving the user's encoded events.
+        """
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        """
+        Remove a connection of a user. Must be called on the event loop.
+
+        Args:
+            user_id (int): ID of the connected user.
+            queue (asyncio.Queue): Queue returned by subscribe.
+        """
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: int, update: dict):
+        """
+        Send an update to every connection of a user. Safe to call from any thread.
+
+        Args:
+            user_id (int): ID of the user the update concerns.
+            update (dict): The update, with a "type" key.
+        """
+        loop = self._loop
+        if loop is None or user_id not in self._subscribers:
+            return  # Nobody connected
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, user_id, update)  # Queues are only touched on the loop
+
+    def broadcast(self, update: dict):
+        """
+        Send an update to every connection. Must be called on the event loop.
+
+        Args:
+            update (dict): The update, with a "type" key.
+        """
+        for user_id in list(self._subscribers):
+            self._deliver(user_id, update)
+
+    def connections(self) -> int:
+        """Number of open connections."""
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def _deliver(self, user_id, update):
+        message = format_event(update)  # Encoded once for all the user's connections
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and have the client reload its state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(format_event({"type": "resync"}))
+
+
+def publish_habit_update(db: Session, user_id: int, update: dict):
+    """
+    Queue a habit update for the user's live streams, to be delivered when the change commits.
+
+    On PostgreSQL the update is sent with NOTIFY inside the current transaction and relayed
+    to the subscribers of every worker by the listener; otherwise it is delivered to this
+    worker's subscribers after commit. Nothing is delivered if the transaction rolls back.
+
+    Args:
+        db (Session): SQLAlchemy database session holding the change.
+        user_id (int): ID of the user owning the habit.
+        update (dict): The update, with a "type" key.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        payload = orjson.dumps({"user_id": user_id, "update": update}).decode()
+        db.execute(select(func.pg_notify(HABIT_UPDATES_CHANNEL, payload)))
+    else:
+        db.info.setdefault(_PENDING_EVENTS, []).append((user_id, update))
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_committed_updates(session: Session):
+    for user_id, update in session.info.pop(_PENDING_EVENTS, ()):
+        habit_update_broker.publish(user_id, update)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_updates(session: Session):
+    session.info.pop(_PENDING_EVENTS, None)
+
+
+def apply_habit_update(payload: str):
+    """
+    Deliver a habit update received from the database to this worker's subscribers.
+
+    Args:
+        payload (str): JSON message of the form {"user_id": ..., "update": {...}}.
+    """
+    try:
+        message = orjson.loads(payload)
+        habit_update_broker.publish(int(message["user_id"]), message["update"])
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Ignoring malformed habit update message %r", payload)
+
+
+# Broker shared by the streams of this worker process
+habit_update_broker = HabitUpdateBroker()
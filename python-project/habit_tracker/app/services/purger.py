@@ -0,0 +1,114 @@
+# habit_tracker/app/services/purger.py
+
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import delete, select
+from app import models
+from app.database import SessionLocal, advisory_lock, shards
+
+logger = logging.getLogger(__name__)
+
+# Number of events deleted per transaction
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+# Seconds between purge runs
+PURGE_INTERVAL = int(os.getenv("PURGE_INTERVAL_SECONDS", "60"))
+# Seconds to pause between batches, leaving room for other writers
+PURGE_BATCH_PAUSE = float(os.getenv("PURGE_BATCH_PAUSE_SECONDS", "0.01"))
+# Advisory lock key ensuring a single active purge across workers
+PURGE_LOCK_KEY = 726_300_002
+
+
+def purge_deleted_habits(batch_size: int = PURGE_BATCH_SIZE, pause: float = PURGE_BATCH_PAUSE,
+                         session_factory=SessionLocal):
+    """
+    Remove soft-deleted habits and their events from the database.
+
+    Events are deleted by ID in batches of at most `batch_size`, each batch in its own short
+    transaction, without loading them into the session. Once a habit has no events left, the
+    habit row is deleted together with any event added in the meantime. Only one run is
+    active at a time across all workers.
+
+    Args:
+        batch_size (int, optional): Number of events per batch. Defaults to PURGE_BATCH_SIZE.
+        pause (float, optional): Seconds to sleep between batches. Defaults to PURGE_BATCH_PAUSE.
+        session_factory (Callable[[], Session], optional): Creates the purge session. Defaults to SessionLocal.
+
+    Returns:
+        Tuple[int, int]: Number of habits and events purged, or None if another run holds the lock.
+    """
+    with advisory_lock(PURGE_LOCK_KEY) as acquired:
+        if not acquired:
+            return None
+        habits = events = 0
+        db = session_factory()
+        try:
+            habit_ids = db.execute(select(models.Habit.id).where(
+                models.Habit.deleted_at.is_not(None)).order_by(models.Habit.id)).scalars().all()
+            db.commit()  # Do not hold the snapshot while purging
+            for habit_id in habit_ids:
+                while True:
+                    batch = select(models.HabitEvent.id).where(
+                        models.HabitEvent.habit_id == habit_id).limit(batch_size).scalar_subquery()
+                    deleted = db.execute(delete(models.HabitEvent).where(models.HabitEvent.id.in_(batch)).execution_options(
+                        synchronize_session=False)).rowcount
+                    db.commit()  # Commit the batch, releasing its row locks
+                    events += deleted
+                    if deleted < batch_size:
+                        break
+                    time.sleep(pause)
+                db.execute(delete(models.HabitEvent).where(models.HabitEvent.habit_id == habit_id).execution_options(
+                    synchronize_session=False))  # Events added while the batches ran
+                db.execute(delete(models.Habit).where(
+                    models.Habit.id == habit_id, models.Habit.deleted_at.is_not(None)).execution_options(
+                    synchronize_session=False))
+                db.commit()
+                habits += 1
+        finally:
+            db.close()
+        return habits, events
+
+
+class HabitPurger:
+    """
+    Background task purging soft-deleted habits every PURGE_INTERVAL seconds.
+
+    Shards are purged one after the other, in a worker thread, so the event loop keeps
+    serving requests.
+    """
+
+    def __init__(self, interval: float = PURGE_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        """Start the purge loop."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the purge loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for index, session_factory in enumerate(shards.sessionmakers):
+                try:
+                    purged = await asyncio.to_thread(purge_deleted_habits, session_factory=session_factory)
+                except Exception:
+                    logger.exception("Purging deleted habits of shard %d failed", index)
+                    continue
+                if purged and purged[0]:
+                    logger.info("Purged %d deleted habits and %d events from shard %d", *purged, index)
+
+
+# Purger started from the application lifespan
+habit_purger = HabitPurger()
@@ -0,0 +1,145 @@
+# habit_tracker/app/services/scheduler.py
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import joinedload
+from app import models
+from app.database import advisory_lock, shards
+from app.services.habits import backfill_event_local_days, publish_status_changes, refresh_unchanged_habit_status
+from app.utils.timezones import local_today
+
+logger = logging.getLogger(__name__)
+
+# Number of habits recomputed and committed per batch
+PRECOMPUTE_BATCH_SIZE = int(os.getenv("PRECOMPUTE_BATCH_SIZE", "500"))
+# Seconds after each full hour at which the precomputation starts
+PRECOMPUTE_DELAY = int(os.getenv("PRECOMPUTE_DELAY_SECONDS", "60"))
+# Advisory lock key ensuring a single active precomputation run across workers
+PRECOMPUTE_LOCK_KEY = 726_300_001
+
+
+def precompute_habit_statuses(batch_size: int = PRECOMPUTE_BATCH_SIZE, session_factory=None):
+    """
+    Recompute the streak and broken flag of every habit whose values are not for its owner's
+    current local day, in batches of habits ordered by ID.
+
+    Each batch is committed and released from the session before the next one is loaded,
+    so long runs hold neither row locks nor memory. A habit changed after its batch was
+    loaded is skipped, since the change stored up-to-date values. Shards are processed in parallel and
+    only one run is active at a time across all workers.
+
+    Args:
+        batch_size (int, optional): Number of habits per batch. Defaults to PRECOMPUTE_BATCH_SIZE.
+        session_factory (Callable[[], Session], optional): Creates the session of a single database
+            to refresh. Defaults to every shard.
+
+    Returns:
+        int: Number of habits refreshed, or None if another run holds the lock.
+    """
+    with advisory_lock(PRECOMPUTE_LOCK_KEY) as acquired:
+        if not acquired:
+            return None
+        if session_factory is not None:
+            db = session_factory()
+            try:
+                return _precompute_shard(db, batch_size)
+            finally:
+                db.close()
+        return sum(shards.fan_out(lambda db: _precompute_shard(db, batch_size)))  # Shards run in parallel
+
+
+def _precompute_shard(db, batch_size: int):
+    """Refresh the stale habit statuses of one shard, returning the number of habits refreshed."""
+    refreshed = 0
+    last_id = 0
+    backfilled = backfill_event_local_days(db) > 0  # Events recorded before local days were stored
+    while True:
+        batch = db.query(models.Habit).options(joinedload(models.Habit.owner)).filter(
+            models.Habit.id > last_id, models.Habit.deleted_at.is_(None)).order_by(
+            models.Habit.id).limit(batch_size).all()  # Keyset pagination
+        if not batch:
+            break
+        for db_habit in batch:
+            today = local_today(db_habit.owner.timezone)
+            if backfilled or db_habit.status_day != today:  # Owner's day rolled over since the last refresh
+                previous_status = (db_habit.streak, db_habit.is_broken)
+                if refresh_unchanged_habit_status(db, db_habit, today=today):  # Not if checked off meanwhile
+                    publish_status_changes(db, db_habit, previous_status)  # Habits that broke overnight
+                    refreshed += 1
+        last_id = batch[-1].id
+        db.commit()  # Commit the batch
+        db.expunge_all()  # Release the batch from the identity map
+    return refreshed
+
+
+def seconds_until_next_run(now: datetime = None):
+    """
+    Compute the delay until the next scheduled precomputation.
+
+    Args:
+        now (datetime, optional): Current UTC time. Defaults to datetime.utcnow().
+
+    Returns:
+        float: Seconds until PRECOMPUTE_DELAY seconds past the next full hour, when the
+            local day of users in whole-hour time zones rolls over.
+    """
+    now = now or datetime.utcnow()
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return (next_hour - now).total_seconds() + PRECOMPUTE_DELAY
+
+
+class StatusScheduler:
+    """
+    Background task precomputing habit statuses after each local day rollover and on demand.
+
+    The computation runs in a worker thread, so the event loop keeps serving requests.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._wake = None
+
+    def start(self):
+        """Start the scheduler loop and run one precomputation immediately."""
+        self._wake = asyncio.Event()
+        self._wake.set()  # Values precomputed before this worker started may be from an earlier day
+        self._task = asyncio.create_task(self._run())
+
+    def trigger(self):
+        """Request a precomputation as soon as possible."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        """Stop the scheduler loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=seconds_until_next_run())
+            except asyncio.TimeoutError:
+                pass  # Hour boundary, some users' day rolled over
+            self._wake.clear()
+            try:
+                refreshed = await asyncio.to_thread(precompute_habit_statuses)
+            except Exception:
+                logger.exception("Habit status precomputation failed")
+                continue
+            if refreshed is None:
+                logger.info("Habit status precomputation already running elsewhere, skipped")
+            else:
+                logger.info("Precomputed the status of %d habits", refreshed)
+
+
+# Scheduler started from the application lifespan
+status_scheduler = StatusScheduler()
@@ -38,7 +38,8 @@ def create_user(db: Session, user: schemas.UserCreate):
         first_name=user.first_name, 
         last_name=user.last_name, 
         email=user.email, 
-        hashed_password=hashed_password
+        hashed_password=hashed_password,
+        timezone=user.timezone
     )
     db.add(db_user)  # Add user to session
     db.commit()  # Commit transaction
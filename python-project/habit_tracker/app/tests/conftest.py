@@ -0,0 +1,124 @@
+# habit_tracker/app/tests/conftest.py
+
+import os
+import tempfile
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+
+def _clone_template_database(url: str, worker: str) -> str:
+    """
+    Create a private copy of a PostgreSQL test database for one pytest-xdist worker.
+
+    Args:
+        url (str): URL of the template database.
+        worker (str): pytest-xdist worker ID, e.g. "gw0".
+
+    Returns:
+        str: URL of the worker's database.
+    """
+    template = make_url(url)
+    clone = template.set(database=f"{template.database}_{worker}")
+    admin = create_engine(template.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{clone.database}"'))
+        connection.execute(text(f'CREATE DATABASE "{clone.database}" TEMPLATE "{template.database}"'))
+    admin.dispose()
+    return clone.render_as_string(hide_password=False)
+
+
+# Configure the application before it is imported: an in-memory SQLite database unless
+# TEST_DATABASE_URL names another one, no startup seeding, and a cache file private to this process.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite://")
+if os.getenv("PYTEST_XDIST_WORKER") and TEST_DATABASE_URL.startswith("postgresql"):
+    TEST_DATABASE_URL = _clone_template_database(TEST_DATABASE_URL, os.environ["PYTEST_XDIST_WORKER"])
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ["SEED_DATABASE"] = "0"
+os.environ["ANALYTICS_CACHE_PATH"] = os.path.join(tempfile.gettempdir(), f"habit_tracker_test_{os.getpid()}.cache")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import models
+from app.database import Base, engine, get_db
+from app.main import app
+from app.utils.cache import analytics_cache
+
+
+@pytest.fixture(scope="session")
+def connection():
+    """
+    Fixture for creating the schema once per test session.
+
+    Yields:
+        Connection: Database connection shared by the tests
+    """
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        yield connection
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def test_db(connection):
+    """
+    Fixture for creating a database session whose changes are rolled back after the test.
+
+    Commits made by the application only release a savepoint inside the outer transaction.
+
+    Yields:
+        Session: Database session object
+    """
+    transaction = connection.begin()
+    db = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    analytics_cache.clear()  # Rolled-back IDs are reused by later tests
+    yield db
+    db.close()
+    transaction.rollback()
+
+
+@pytest.fixture
+def client(test_db):
+    """
+    Fixture for creating a test client whose requests use the test session.
+
+    Yields:
+        TestClient: FastAPI test client
+    """
+    def override_get_db():
+        yield test_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def user(test_db):
+    """
+    Fixture for creating a user without going through password hashing.
+
+    Returns:
+        models.User: Created user
+    """
+    db_user = models.User(first_name="Jane", last_name="Doe", email="jane@example.com", hashed_password="unused")
+    test_db.add(db_user)
+    test_db.commit()
+    return db_user
+
+
+@pytest.fixture
+def habit(client, user):
+    """
+    Fixture for creating a habit for the test user.
+
+    Returns:
+        dict: Created habit as returned by the API
+    """
+    response = client.post(f"/habits/?user_id={user.id}", json={
+        "name": "Fixture Habit",
+        "description": "Fixture Description",
+        "periodicity": "daily",
+    })
+    return response.json()
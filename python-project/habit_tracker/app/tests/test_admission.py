@@ -0,0 +1,78 @@
+# habit_tracker/app/tests/test_admission.py
+
+import asyncio
+
+import pytest
+from app.utils import admission, security
+from app.utils.admission import ConcurrencyLimiter, Overloaded, TokenBucketLimiter
+
+
+def test_concurrency_limiter_queues_and_sheds():
+    """
+    Test case for the concurrency limiter.
+
+    It verifies that requests over the limit wait in FIFO order, receive freed slots,
+    and are shed when the queue is full or their wait times out.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, queue_timeout=0.05)
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await limiter.acquire()  # Queue full
+        assert limiter.stats()["queued"] == 1
+
+        limiter.release()  # Handed over to the waiting request
+        await waiting
+        assert limiter.stats()["active"] == 1
+
+        with pytest.raises(Overloaded):
+            await limiter.acquire()  # Times out
+        limiter.release()
+        assert limiter.stats() == {"limit": 1, "active": 0, "queued": 0, "admitted": 2, "shed": 1, "timed_out": 1}
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket():
+    """
+    Test case for the per-user token buckets.
+
+    It verifies that a user is refused after the burst while other users are not.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    limiter = TokenBucketLimiter(rate=1, burst=2)
+    assert limiter.take(1) == limiter.take(1) == 0
+    assert 0 < limiter.take(1) <= 1
+    assert limiter.take(2) == 0
+    assert limiter.rejected == 1
+
+
+def test_rate_limited_route_and_metrics(client, user, monkeypatch):
+    """
+    Test case for an admission-controlled route.
+
+    It verifies that a user over their rate limit gets 429 with Retry-After and that the
+    admin metrics report it.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    monkeypatch.setattr(admission.rate_limiters["analytics.longest_streak"], "_buckets", {})
+    rejected = admission.rate_limiters["analytics.longest_streak"].rejected
+    statuses = [client.get(f"/analytics/habits/longest_streak/?user_id={user.id}")
+                for _ in range(admission.USER_RATE_BURST + 1)]
+    assert [response.status_code for response in statuses[:-1]] == [200] * admission.USER_RATE_BURST
+    assert statuses[-1].status_code == 429 and int(statuses[-1].headers["Retry-After"]) >= 1
+
+    assert client.get("/admin/metrics/").status_code == 403
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "secret")
+    metrics = client.get("/admin/metrics/", headers={"X-Admin-Token": "secret"}).json()
+    assert metrics["admission"]["analytics.longest_streak"]["rate_limited"] == rejected + 1
+    assert metrics["admission"]["analytics.longest_streak"]["active"] == 0
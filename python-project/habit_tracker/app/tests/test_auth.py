@@ -1,12 +1,24 @@
 # habit_tracker/app/tests/test_auth.py
 
-from fastapi.testclient import TestClient
-from app.main import app
+import pytest
 
-client = TestClient(app)
+
+@pytest.fixture
+def signed_up(client):
+    """
+    Fixture for signing up the test user through the API.
+
+    Returns:
+        Response: Signup response
+    """
+    return client.post(
+        "/auth/signup/",
+        json={"first_name": "John", "last_name": "Doe",
+              "email": "john@example.com", "password": "password"}
+    )
 
 
-def test_create_user():
+def test_create_user(signed_up):
     """
     Test case for user creation endpoint (/auth/signup/).
 
@@ -15,17 +27,13 @@ def test_create_user():
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    response = client.post(
-        "/auth/signup/",
-        json={"first_name": "John", "last_name": "Doe",
-              "email": "john@example.com", "password": "password"}
-    )
+    response = signed_up
 
     assert response.status_code == 200
     assert response.json()["email"] == "john@example.com"
 
 
-def test_login_user():
+def test_login_user(client, signed_up):
     """
     Test case for user login endpoint (/auth/login/).
 
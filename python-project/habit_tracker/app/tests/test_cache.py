@@ -0,0 +1,107 @@
+# habit_tracker/app/tests/test_cache.py
+
+import multiprocessing
+
+import pytest
+from app.utils.cache import SharedMemoryCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """
+    Fixture for creating a small shared-memory cache backed by a temporary file.
+
+    Returns:
+        SharedMemoryCache: Empty cache instance
+    """
+    return SharedMemoryCache(path=str(tmp_path / "cache.bin"), slots=16, slot_size=128, ttl=60)
+
+
+def _store_in_child(path):
+    SharedMemoryCache(path=path, slots=16, slot_size=128, ttl=60).set(("streak", 7), 12, habit_id=7)
+
+
+def test_cached_computes_once(cache):
+    """
+    Test case for cache-through lookups.
+
+    It verifies that a value is computed on a miss and served from the cache afterwards,
+    including falsy values.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    assert cache.cached("broken", lambda: False) is False
+    assert cache.cached("broken", lambda: True) is False
+    assert cache.stats()["hits"] == 1
+
+
+def test_values_are_shared_between_processes(cache):
+    """
+    Test case for cross-process sharing.
+
+    It verifies that a value written by another process is visible through the same file.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    child = multiprocessing.get_context("fork").Process(target=_store_in_child, args=(cache.path,))
+    child.start()
+    child.join()
+    assert cache.get(("streak", 7)) == 12
+
+
+def test_invalidate_by_user_and_habit(cache):
+    """
+    Test case for invalidation.
+
+    It verifies that entries tagged with the changed user or habit are evicted, others are kept
+    and new values can be stored afterwards.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    cache.set("user", 1, user_id=1)
+    cache.set("habit", 2, habit_id=5)
+    cache.set("other", 3, user_id=2, habit_id=6)
+    cache.invalidate(user_id=1, habit_id=5)
+    assert cache.get("user") is None
+    assert cache.get("habit") is None
+    assert cache.get("other") == 3
+    cache.set("user", 4, user_id=1)
+    assert cache.get("user") == 4
+
+
+def test_value_computed_before_invalidation_is_not_stored(cache):
+    """
+    Test case for invalidations racing with a computation.
+
+    It verifies that a value whose habit is invalidated while it is computed is returned
+    to its caller but not stored, so the next lookup recomputes.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    def compute_during_checkoff():
+        cache.invalidate(habit_id=7)  # A check-off commits while the old history is evaluated
+        return "stale"
+
+    assert cache.cached(("streak", 7), compute_during_checkoff, habit_id=7) == "stale"
+    assert cache.get(("streak", 7)) is None
+    assert cache.cached(("streak", 7), lambda: "fresh", habit_id=7) == "fresh"
+    assert cache.get(("streak", 7)) == "fresh"
+
+
+def test_size_is_bounded(cache):
+    """
+    Test case for eviction.
+
+    It verifies that the cache never holds more entries than it has slots and skips oversized values.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    for i in range(100):
+        cache.set(i, i)
+    assert sum(cache.get(i) is not None for i in range(100)) <= cache.slots
+    assert cache.set("big", "x" * cache.slot_size) is False
@@ -1,39 +1,16 @@
 # habit_tracker/app/tests/test_habits.py
 
-import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-from app.database import SessionLocal, Base, engine
-from app import models
-
-
-@pytest.fixture(scope="module")
-def test_db():
-    """
-    Fixture for creating a test database session.
-
-    Yields:
-        Session: Database session object
-    """
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    yield db
-    db.close()
-    Base.metadata.drop_all(bind=engine)
+from datetime import date, datetime
 
-
-@pytest.fixture(scope="module")
-def client():
-    """
-    Fixture for creating a test client instance.
-
-    Returns:
-        TestClient: FastAPI test client
-    """
-    return TestClient(app)
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import engine
+from app.services.purger import purge_deleted_habits
+from app.services.scheduler import precompute_habit_statuses
 
 
-def test_create_habit(client, test_db):
+def test_create_habit(client, user):
     """
     Test case for creating a habit.
 
@@ -42,8 +19,7 @@ def test_create_habit(client, test_db):
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    user_id = 1  # Assuming user with ID 1 exists in your test environment
-    response = client.post(f"/habits/?user_id={user_id}", json={
+    response = client.post(f"/habits/?user_id={user.id}", json={
         "name": "Test Habit",
         "description": "Test Description",
         "periodicity": "daily",
@@ -52,7 +28,7 @@ def test_create_habit(client, test_db):
     assert response.json()["name"] == "Test Habit"
 
 
-def test_read_habits(client, test_db):
+def test_read_habits(client, user, habit):
     """
     Test case for reading habits.
 
@@ -61,12 +37,12 @@ def test_read_habits(client, test_db):
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    response = client.get("/habits/?user_id=1")
+    response = client.get(f"/habits/?user_id={user.id}")
     assert response.status_code == 200
     assert len(response.json()) > 0
 
 
-def test_update_habit(client, test_db):
+def test_update_habit(client, user, habit):
     """
     Test case for updating a habit.
 
@@ -75,7 +51,7 @@ def test_update_habit(client, test_db):
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    habit_id = client.get("/habits/?user_id=1").json()[0]["id"]
+    habit_id = client.get(f"/habits/?user_id={user.id}").json()[0]["id"]
     response = client.put(f"/habits/{habit_id}", json={
         "name": "Updated Habit",
         "description": "Updated Description",
@@ -85,7 +61,7 @@ def test_update_habit(client, test_db):
     assert response.json()["name"] == "Updated Habit"
 
 
-def test_checkoff_habit(client, test_db):
+def test_checkoff_habit(client, user, habit):
     """
     Test case for checking off a habit.
 
@@ -94,8 +70,8 @@ def test_checkoff_habit(client, test_db):
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    habit_id = client.get("/habits/?user_id=1").json()[0]["id"]
-    response = client.put(f"/habits/{habit_id}/checkoff?user_id=1")
+    habit_id = client.get(f"/habits/?user_id={user.id}").json()[0]["id"]
+    response = client.put(f"/habits/{habit_id}/checkoff?user_id={user.id}")
 
     if response.status_code != 200:
         print("Response status code:", response.status_code)
@@ -105,7 +81,7 @@ def test_checkoff_habit(client, test_db):
     assert response.json()["id"] == habit_id
 
 
-def test_delete_habit(client, test_db):
+def test_delete_habit(client, user, habit):
     """
     Test case for deleting a habit.
 
@@ -114,13 +90,13 @@ def test_delete_habit(client, test_db):
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    habit_id = client.get("/habits/?user_id=1").json()[0]["id"]
+    habit_id = client.get(f"/habits/?user_id={user.id}").json()[0]["id"]
     response = client.delete(f"/habits/{habit_id}")
     assert response.status_code == 200
     assert response.json()["id"] == habit_id
 
 
-def test_habit_streak(client, test_db):
+def test_habit_streak(client, user, habit):
     """
     Test case for getting habit streak.
 
@@ -129,13 +105,13 @@ def test_habit_streak(client, test_db):
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    habit_id = client.get("/habits/?user_id=1").json()[0]["id"]
+    habit_id = client.get(f"/habits/?user_id={user.id}").json()[0]["id"]
     response = client.get(f"/habits/{habit_id}/streak/")
     assert response.status_code == 200
     assert isinstance(response.json(), int)
 
 
-def test_habit_is_broken(client, test_db):
+def test_habit_is_broken(client, user, habit):
     """
     Test case for checking if a habit is broken.
 
@@ -144,7 +120,153 @@ def test_habit_is_broken(client, test_db):
     Raises:
         AssertionError: If the expected response does not match the actual response
     """
-    habit_id = client.get("/habits/?user_id=1").json()[0]["id"]
+    habit_id = client.get(f"/habits/?user_id={user.id}").json()[0]["id"]
     response = client.get(f"/habits/{habit_id}/is_broken/")
     assert response.status_code == 200
     assert isinstance(response.json(), bool)
+
+
+def test_legacy_periodicity_is_read_without_errors(client, user, habit, connection, test_db):
+    """
+    Test case for habits stored with a periodicity the rule engine does not support.
+
+    It verifies that such habits read as never building a streak, that the reads still
+    succeed and that the status precomputation goes on with the following habits.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    legacy = models.Habit(name="Legacy", description="Legacy", periodicity="biweekly", owner_id=user.id)
+    test_db.add(legacy)
+    test_db.commit()
+    later = models.Habit(name="Later", description="Later", periodicity="daily", owner_id=user.id)
+    test_db.add_all([later, models.HabitEvent(habit_id=legacy.id, timestamp=datetime.utcnow(), local_day=date.today())])
+    test_db.commit()
+
+    assert client.get(f"/habits/{legacy.id}/streak/").json() == 0
+    assert client.get(f"/habits/{legacy.id}/is_broken/").json() is True
+    dashboard = {row["id"]: row for row in client.get(f"/habits/dashboard/?user_id={user.id}").json()}
+    assert dashboard[legacy.id]["current_streak"] == 0 and dashboard[legacy.id]["is_broken"] is True
+    assert client.get(f"/analytics/habits/longest_streak/?user_id={user.id}").status_code == 200
+
+    session_factory = sessionmaker(bind=connection, join_transaction_mode="create_savepoint")
+    assert precompute_habit_statuses(session_factory=session_factory) >= 2
+    test_db.expire_all()
+    assert test_db.get(models.Habit, later.id).status_day is not None
+
+
+def test_conditional_get(client, user, habit):
+    """
+    Test case for conditional GETs of habit data.
+
+    It verifies that a matching If-None-Match is answered with 304 and that a check-off
+    changes the ETags of the habit's events and streak.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    urls = [f"/habits/?user_id={user.id}", f"/habits/{habit['id']}/events/", f"/habits/{habit['id']}/streak/"]
+    etags = [client.get(url).headers["ETag"] for url in urls]
+    for url, etag in zip(urls, etags):
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    client.put(f"/habits/{habit['id']}/checkoff?user_id={user.id}")
+    for url, etag in zip(urls, etags):
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+    assert len(client.get(urls[1]).json()) == 1
+
+
+def test_dashboard_query_count(client, user, habit):
+    """
+    Test case for the dashboard.
+
+    It verifies that the dashboard reports streaks and check-offs of every habit and runs
+    the same number of queries whatever the number of habits.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    statements = []
+    user_id = user.id
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def dashboard():
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = client.get(f"/habits/dashboard/?user_id={user_id}")
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        assert response.status_code == 200
+        return response.json(), len(statements)
+
+    client.put(f"/habits/{habit['id']}/checkoff?user_id={user.id}")
+    habits, queries = dashboard()
+    assert habits[0]["current_streak"] == habits[0]["longest_streak"] == 1
+    assert not habits[0]["is_broken"] and habits[0]["last_checkoff_at"] is not None
+
+    for number in range(5):
+        client.post(f"/habits/?user_id={user.id}", json={
+            "name": f"Habit {number}", "description": "Description", "periodicity": "weekly"})
+    habits, more_queries = dashboard()
+    assert len(habits) == 6
+    assert habits[-1]["last_checkoff_at"] is None and habits[-1]["is_broken"]
+    assert more_queries == queries == 3
+
+
+def test_batch(client, user, habit):
+    """
+    Test case for batch requests.
+
+    It verifies that operations are applied in order, that temp IDs resolve to habits
+    created earlier in the batch and that a failed operation does not affect the others.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    response = client.post(f"/habits/batch/?user_id={user.id}", json={"operations": [
+        {"op": "create", "temp_id": "new", "data": {"name": "Batch Habit", "description": "Offline", "periodicity": "daily"}},
+        {"op": "checkoff", "habit_id": "new"},
+        {"op": "update", "habit_id": "new", "data": {"name": "Renamed", "description": None, "periodicity": None}},
+        {"op": "checkoff", "habit_id": 999999},
+        {"op": "checkoff", "habit_id": "missing"},
+        {"op": "delete", "habit_id": habit["id"]},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    new_id = body["temp_ids"]["new"]
+    assert [result["status_code"] for result in body["results"]] == [200, 200, 200, 404, 400, 200]
+    assert body["results"][2]["habit"] == {**body["results"][0]["habit"], "name": "Renamed"}
+
+    habits = client.get(f"/habits/?user_id={user.id}").json()
+    assert [(item["id"], item["name"]) for item in habits] == [(new_id, "Renamed")]
+    assert len(client.get(f"/habits/{new_id}/events/").json()) == 1
+
+
+def test_deleted_habit_is_purged_in_batches(client, user, habit, connection, test_db):
+    """
+    Test case for soft deletion and purging.
+
+    It verifies that a deleted habit disappears from every read immediately and that the
+    purger later removes it and all its events.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    test_db.add_all([models.HabitEvent(habit_id=habit["id"], timestamp=datetime(2024, 1, day), local_day=date(2024, 1, day))
+                     for day in range(1, 26)])
+    test_db.commit()
+    assert client.delete(f"/habits/{habit['id']}").status_code == 200
+    assert client.get(f"/habits/?user_id={user.id}").json() == []
+    assert client.get(f"/habits/{habit['id']}/events/").json() == []
+    assert client.put(f"/habits/{habit['id']}/checkoff?user_id={user.id}").status_code == 404
+
+    purge_session = sessionmaker(bind=connection, join_transaction_mode="create_savepoint")
+    assert purge_deleted_habits(batch_size=10, pause=0, session_factory=purge_session) == (1, 25)
+    assert test_db.query(models.Habit).count() == test_db.query(models.HabitEvent).count() == 0
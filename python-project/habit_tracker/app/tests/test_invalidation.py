@@ -0,0 +1,72 @@
+# habit_tracker/app/tests/test_invalidation.py
+
+from app.services.invalidation import apply_invalidation, publish_invalidation
+from app.utils.cache import analytics_cache
+
+
+def test_committed_change_evicts_cached_results(test_db, user, habit):
+    """
+    Test case for invalidation on commit.
+
+    It verifies that a published change evicts the cached results of its habit and user
+    once the transaction commits, and not before.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    analytics_cache.set(("habit_streak", habit["id"]), 3, user_id=user.id, habit_id=habit["id"])
+    analytics_cache.set(("longest_streak", user.id), 4, user_id=user.id)
+    publish_invalidation(test_db, user.id, habit["id"])
+    assert analytics_cache.get(("habit_streak", habit["id"])) == 3  # Other readers still see committed data
+    test_db.commit()
+    assert analytics_cache.get(("habit_streak", habit["id"])) is None
+    assert analytics_cache.get(("longest_streak", user.id)) is None
+
+
+def test_rolled_back_change_keeps_cached_results(test_db, user, habit):
+    """
+    Test case for invalidation on rollback.
+
+    It verifies that a change that is rolled back evicts nothing, even after a later commit.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    analytics_cache.set(("habit_streak", habit["id"]), 3, user_id=user.id, habit_id=habit["id"])
+    publish_invalidation(test_db, user.id, habit["id"])
+    test_db.rollback()
+    test_db.commit()
+    assert analytics_cache.get(("habit_streak", habit["id"])) == 3
+
+
+def test_apply_invalidation():
+    """
+    Test case for invalidation messages from other workers.
+
+    It verifies that a message evicts the named user and habit and that malformed messages are ignored.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    analytics_cache.clear()
+    analytics_cache.set("habit", 1, user_id=41, habit_id=42)
+    analytics_cache.set("other", 2, user_id=43, habit_id=44)
+    apply_invalidation("not-a-message")
+    assert analytics_cache.get("habit") == 1
+    apply_invalidation("41:42")
+    assert analytics_cache.get("habit") is None
+    assert analytics_cache.get("other") == 2
+
+
+def test_checkoff_refreshes_cached_streak(client, user, habit):
+    """
+    Test case for invalidation through the API.
+
+    It verifies that a check-off is reflected by the next streak read instead of a cached value.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    assert client.get(f"/analytics/habits/{habit['id']}/longest_streak/").json() == 0
+    client.put(f"/habits/{habit['id']}/checkoff?user_id={user.id}")
+    assert client.get(f"/analytics/habits/{habit['id']}/longest_streak/").json() == 1
@@ -0,0 +1,47 @@
+# habit_tracker/app/tests/test_memory.py
+
+import tracemalloc
+
+from app.utils import security
+from app.utils.memory import measure_peak, route_peaks, start_memory_tracking, stop_memory_tracking
+
+
+def test_measure_peak():
+    """
+    Test case for measuring the allocation peak of a call.
+
+    It verifies that a temporary allocation counts towards the peak even once freed.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    result, peak = measure_peak(lambda: len(bytearray(1_000_000)))
+    stop_memory_tracking()
+    assert result == 1_000_000
+    assert peak >= 1_000_000
+
+
+def test_route_peaks_are_listed(client, user, habit, monkeypatch):
+    """
+    Test case for per-route memory peaks.
+
+    It verifies that requests are aggregated by route template and listed by the admin endpoint.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    monkeypatch.setattr(route_peaks, "routes", {})
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "secret")
+    start_memory_tracking()
+    try:
+        client.get(f"/habits/{habit['id']}/events/")
+        client.get(f"/habits/{habit['id']}/events/")
+        listed = client.get("/admin/memory/", headers={"X-Admin-Token": "secret"}).json()
+    finally:
+        stop_memory_tracking()
+
+    assert listed["tracing"] is True
+    events_route = listed["routes"]["/habits/{habit_id}/events/"]
+    assert events_route["requests"] == 2 and events_route["max_peak_bytes"] > 0
+    assert listed["top_sites"]
+    assert not tracemalloc.is_tracing()
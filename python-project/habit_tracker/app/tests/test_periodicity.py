@@ -0,0 +1,135 @@
+# habit_tracker/app/tests/test_periodicity.py
+
+from datetime import date
+
+import pytest
+from app.services.periodicity import UnsupportedRule, compile_periodicity, habit_rule
+
+MONDAY = date(2024, 1, 1).toordinal()  # 2024-01-01 is a Monday
+
+
+def days(*offsets):
+    """Day numbers relative to MONDAY."""
+    return [MONDAY + offset for offset in offsets]
+
+
+def test_compile_is_cached_and_normalized():
+    """
+    Test case for rule compilation.
+
+    It verifies that equivalent periodicity strings compile to the same cached rule
+    and that unsupported ones are rejected.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    assert compile_periodicity("Every 3 Days") is compile_periodicity("Every 3 Days")
+    assert compile_periodicity("every  3 days").interval == 3
+    for periodicity in ("sometimes", "every 0 days", "8 times per week", "on funday"):
+        with pytest.raises(ValueError):
+            compile_periodicity(periodicity)
+
+
+def test_stored_unsupported_periodicity():
+    """
+    Test case for reading a stored periodicity that is not supported.
+
+    It verifies that the habit never builds a streak instead of raising.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    assert habit_rule("daily") is compile_periodicity("daily")
+    rule = habit_rule("biweekly")
+    assert isinstance(rule, UnsupportedRule)
+    summary = rule.evaluate(days(0, 1, 2))
+    assert (summary.longest, summary.current, summary.deadline) == (0, 0, None)
+    assert rule.is_broken(summary, MONDAY + 2) and rule.current_streak(summary, MONDAY + 2) == 0
+
+
+def test_daily_and_weekly():
+    """
+    Test case for interval rules.
+
+    It verifies streaks, broken state and deadlines of the daily and weekly rules.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    daily = compile_periodicity("daily")
+    summary = daily.evaluate(days(0, 1, 2, 5, 6))
+    assert (summary.longest, summary.current, summary.deadline) == (3, 2, MONDAY + 8)
+    assert not daily.is_broken(summary, MONDAY + 7)
+    assert daily.is_broken(summary, MONDAY + 8)
+    assert daily.current_streak(summary, MONDAY + 8) == 0
+
+    weekly = compile_periodicity("weekly")
+    assert weekly.evaluate(days(0, 7, 14, 22)).longest == 3
+
+
+def test_times_per_week():
+    """
+    Test case for the N-times-per-week rule.
+
+    It verifies that only weeks with enough check-off days extend the streak.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    rule = compile_periodicity("2 times per week")
+    summary = rule.evaluate(days(0, 3, 7, 8, 14, 21, 22))
+    assert (summary.longest, summary.current) == (2, 1)
+    assert summary.deadline == MONDAY + 35
+    assert rule.history_start(MONDAY + 23) == MONDAY + 14
+
+
+def test_monthly():
+    """
+    Test case for the monthly rule.
+
+    It verifies that several check-offs in a month count once and a skipped month breaks the streak.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    rule = compile_periodicity("monthly")
+    history = [date(2024, month, day).toordinal() for month, day in ((1, 5), (1, 20), (2, 1), (3, 31), (5, 2))]
+    summary = rule.evaluate(history)
+    assert (summary.longest, summary.current) == (3, 1)
+    assert summary.deadline == date(2024, 7, 1).toordinal()
+
+
+def test_specific_weekdays():
+    """
+    Test case for the specific-weekdays rule.
+
+    It verifies that check-offs on unscheduled days are ignored and a missed scheduled day breaks the streak.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    rule = compile_periodicity("on mon, wed, fri")
+    summary = rule.evaluate(days(0, 1, 2, 4, 7, 11))
+    assert (summary.longest, summary.current) == (4, 1)
+    assert summary.deadline == MONDAY + 15  # Broken unless checked off on the Monday after Friday 11
+    assert not rule.is_broken(summary, MONDAY + 14)
+    assert rule.is_broken(summary, MONDAY + 15)
+
+
+@pytest.mark.parametrize("periodicity", ["daily", "weekly", "every 3 days", "2 times per week", "monthly", "on tue, sat"])
+def test_history_start_preserves_broken_state(periodicity):
+    """
+    Test case for partial-history evaluation.
+
+    It verifies that evaluating only the days from history_start gives the same broken state
+    as evaluating the full history.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    rule = compile_periodicity(periodicity)
+    history = days(*range(0, 120, 3)) + days(*range(121, 200, 5))
+    for today in range(MONDAY + 10, MONDAY + 230):
+        past = [day for day in history if day <= today]
+        recent = [day for day in past if day >= rule.history_start(today)]
+        assert rule.is_broken(rule.evaluate(past), today) == rule.is_broken(rule.evaluate(recent), today)
@@ -0,0 +1,35 @@
+# habit_tracker/app/tests/test_profiling.py
+
+import os
+import pstats
+
+from app.utils import profiling, security
+
+
+def test_profile_on_admin_request(client, user, habit, monkeypatch, tmp_path):
+    """
+    Test case for on-demand request profiling.
+
+    It verifies that only requests with the profiling header and a valid admin token are
+    profiled, that the profile includes the endpoint's worker thread and that it is listed
+    with its top frames.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "secret")
+    url = f"/habits/{habit['id']}/streak/"
+    assert "x-profile-id" not in client.get(url, headers={"X-Profile": "1"}).headers
+    assert "x-profile-id" not in client.get(url, headers={"X-Profile": "1", "X-Admin-Token": "wrong"}).headers
+
+    response = client.get(url, headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    stats = pstats.Stats(os.path.join(tmp_path, profile_id))
+    if profiling._PER_THREAD_PROFILERS:
+        assert any(name == "get_streak_endpoint" for (_, _, name) in stats.stats)  # Ran in a worker thread
+
+    listed = client.get("/admin/profiles/", headers={"X-Admin-Token": "secret"}).json()["profiles"][0]
+    assert listed["profile_id"] == profile_id and listed["path"] == url
+    assert listed["top_frames"] and {"function", "calls", "own_ms", "cumulative_ms"} <= set(listed["top_frames"][0])
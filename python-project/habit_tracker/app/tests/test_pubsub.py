@@ -0,0 +1,54 @@
+# habit_tracker/app/tests/test_pubsub.py
+
+import asyncio
+
+from app.services.pubsub import HabitUpdateBroker, habit_update_broker
+
+
+def test_broker_fan_out():
+    """
+    Test case for the habit update broker.
+
+    It verifies that updates published from another thread reach every connection of
+    the user only, and that an overflowing connection is told to resynchronize.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    async def scenario():
+        broker = HabitUpdateBroker(queue_size=2)
+        first, second, other = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+        await asyncio.to_thread(broker.publish, 1, {"type": "checkoff", "habit_id": 7})
+        await asyncio.sleep(0)
+        message = await asyncio.wait_for(first.get(), 1)
+        assert message.startswith(b"event: checkoff\ndata: ") and b'"habit_id":7' in message
+        assert (await second.get()) == message
+        assert other.empty()
+
+        for _ in range(3):
+            broker.publish(1, {"type": "streak", "habit_id": 7, "streak": 1})
+        await asyncio.sleep(0)
+        assert first.qsize() == 1 and first.get_nowait().startswith(b"event: resync")
+
+        broker.unsubscribe(1, first)
+        broker.unsubscribe(1, second)
+        assert broker.connections() == 1
+
+    asyncio.run(scenario())
+
+
+def test_checkoff_publishes_after_commit(client, user, habit, monkeypatch):
+    """
+    Test case for live updates of check-offs.
+
+    It verifies that checking off a habit pushes a check-off and a streak change to the owner.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    published = []
+    monkeypatch.setattr(habit_update_broker, "publish", lambda user_id, update: published.append((user_id, update)))
+    client.put(f"/habits/{habit['id']}/checkoff?user_id={user.id}")
+    assert [(user_id, update["type"]) for user_id, update in published] == [
+        (user.id, "checkoff"), (user.id, "streak"), (user.id, "broken")]
+    assert published[1][1]["streak"] == 1 and published[2][1]["is_broken"] is False
@@ -0,0 +1,40 @@
+# habit_tracker/app/tests/test_querylog.py
+
+from app.utils import security
+from app.utils.querylog import parameter_shape, query_log
+
+
+def test_parameter_shape():
+    """
+    Test case for parameter shapes.
+
+    It verifies that bound parameters are described by type only.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    assert parameter_shape({"habit_id_1": 7, "name": "secret"}) == {"habit_id_1": "int", "name": "str"}
+    assert parameter_shape((7, None)) == ["int", "NoneType"]
+    assert parameter_shape([{"id": 1}, {"id": 2}]) == {"executemany": 2, "rows": {"id": "int"}}
+
+
+def test_slow_queries_are_listed(client, user, habit, monkeypatch):
+    """
+    Test case for the slow-query log.
+
+    It verifies that statements over the threshold are recorded with their parameter
+    shapes, without values, and listed by the admin endpoint.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    monkeypatch.setattr(query_log, "threshold_ms", 0)  # Every statement is slow
+    monkeypatch.setattr(query_log, "slow_queries", query_log.slow_queries.__class__(maxlen=100))
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "secret")
+    client.get(f"/habits/{habit['id']}/events/")
+
+    listed = client.get("/admin/slow-queries/", headers={"X-Admin-Token": "secret"}).json()
+    assert listed["threshold_ms"] == 0 and listed["slow"] >= 1
+    events_query = next(entry for entry in listed["slow_queries"] if "FROM habit_events" in entry["statement"])
+    assert "int" in str(events_query["parameters"]) and str(habit["id"]) not in str(events_query["parameters"])
+    assert events_query["plan"] is None  # Plans are only captured on PostgreSQL
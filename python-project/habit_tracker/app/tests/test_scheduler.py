@@ -0,0 +1,107 @@
+# habit_tracker/app/tests/test_scheduler.py
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import advisory_lock
+from app.services import habits
+from app.services.scheduler import (
+    PRECOMPUTE_DELAY, PRECOMPUTE_LOCK_KEY, precompute_habit_statuses, seconds_until_next_run, status_scheduler)
+from app.utils import security
+
+
+@pytest.fixture
+def session_factory(connection):
+    """
+    Fixture for creating the sessions of the precomputation inside the test transaction.
+
+    Returns:
+        sessionmaker: Session factory bound to the test connection
+    """
+    return sessionmaker(bind=connection, join_transaction_mode="create_savepoint")
+
+
+def test_seconds_until_next_run():
+    """
+    Test case for the precomputation schedule.
+
+    It verifies that runs start PRECOMPUTE_DELAY seconds after each full hour.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    assert seconds_until_next_run(datetime(2024, 1, 1, 10, 30)) == 30 * 60 + PRECOMPUTE_DELAY
+    assert seconds_until_next_run(datetime(2024, 1, 1, 23, 59, 59)) == 1 + PRECOMPUTE_DELAY
+
+
+def test_precompute_refreshes_stale_statuses(user, habit, test_db, session_factory):
+    """
+    Test case for the status precomputation.
+
+    It verifies that habits with values from an earlier day are refreshed, that fresh ones
+    are skipped and that only one run is active at a time.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    test_db.execute(update(models.Habit).where(models.Habit.id == habit["id"]).values(
+        status_day=date(2000, 1, 1), streak=5))
+    test_db.commit()
+    assert precompute_habit_statuses(session_factory=session_factory) == 1
+    test_db.expire_all()
+    refreshed = test_db.get(models.Habit, habit["id"])
+    assert refreshed.status_day != date(2000, 1, 1) and refreshed.streak == 0
+    assert precompute_habit_statuses(session_factory=session_factory) == 0
+
+    with advisory_lock(PRECOMPUTE_LOCK_KEY):
+        assert precompute_habit_statuses(session_factory=session_factory) is None
+
+
+def test_precompute_keeps_values_of_concurrent_checkoff(client, user, habit, test_db, session_factory, monkeypatch):
+    """
+    Test case for a check-off committed while the precomputation evaluates a habit.
+
+    It verifies that the values stored by the check-off are not overwritten with values
+    computed from the history read before it.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    test_db.execute(update(models.Habit).where(models.Habit.id == habit["id"]).values(status_day=date(2000, 1, 1)))
+    test_db.commit()
+    evaluate_habit = habits.evaluate_habit
+    checked_off = []
+
+    def evaluate_then_check_off(*args, **kwargs):
+        result = evaluate_habit(*args, **kwargs)  # History before the check-off
+        if not checked_off:
+            checked_off.append(client.put(f"/habits/{habit['id']}/checkoff?user_id={user.id}").status_code)
+        return result
+
+    monkeypatch.setattr(habits, "evaluate_habit", evaluate_then_check_off)
+    assert precompute_habit_statuses(session_factory=session_factory) == 0
+    assert checked_off == [200]
+    test_db.expire_all()
+    current = test_db.get(models.Habit, habit["id"])
+    assert (current.streak, current.is_broken) == (1, False)
+
+
+def test_refresh_endpoint_requires_admin(client, monkeypatch):
+    """
+    Test case for requesting a precomputation.
+
+    It verifies that only holders of the admin token can trigger a full scan.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    triggered = []
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(status_scheduler, "trigger", lambda: triggered.append(1))
+    assert client.post("/habits/status/refresh/").status_code == 403
+    assert triggered == []
+    assert client.post("/habits/status/refresh/", headers={"X-Admin-Token": "secret"}).status_code == 202
+    assert triggered == [1]
@@ -0,0 +1,98 @@
+# habit_tracker/app/tests/test_sharding.py
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from app import database, models
+from app.database import Base, ShardRouter
+from app.main import app
+from app.utils import security
+
+# Databases of the sharding tests: three in-memory SQLite databases unless TEST_SHARD_URLS
+# names others, e.g. several empty PostgreSQL databases
+TEST_SHARD_URLS = os.getenv("TEST_SHARD_URLS", "sqlite://,sqlite://,sqlite://").split(",")
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    """
+    Fixture for routing the application's requests to a set of empty shards.
+
+    Yields:
+        ShardRouter: Shards used by the application during the test
+    """
+    router = ShardRouter(TEST_SHARD_URLS)
+    for shard_engine in router.engines:
+        Base.metadata.create_all(bind=shard_engine)
+    monkeypatch.setattr(database, "shards", router)
+    yield router
+    for shard_engine in router.engines:
+        Base.metadata.drop_all(bind=shard_engine)
+        shard_engine.dispose()
+
+
+def test_users_and_habits_route_to_their_shard(shards):
+    """
+    Test case for routing users and habits to shards.
+
+    It verifies that a new user is stored on the shard of their email, that user and habit
+    IDs identify that shard, and that requests by ID or email reach it.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    client = TestClient(app)
+    emails = ["ada@example.com", "grace@example.com", "alan@example.com", "edsger@example.com"]
+    assert len({shards.shard_for_email(email) for email in emails}) > 1  # The users spread over several shards
+
+    for email in emails:
+        user = client.post("/auth/signup/", json={
+            "first_name": "Test", "last_name": "User", "email": email, "password": "password"}).json()
+        shard = shards.shard_for_email(email)
+        assert shards.shard_for_id(user["id"]) == shard
+        assert client.get("/auth/login/", params={"email": email, "password": "password"}).status_code == 200
+
+        habit = client.post(f"/habits/?user_id={user['id']}", json={
+            "name": "Sharded", "description": "Sharded", "periodicity": "daily"}).json()
+        assert shards.shard_for_id(habit["id"]) == shard
+        assert client.put(f"/habits/{habit['id']}/checkoff?user_id={user['id']}").status_code == 200
+        assert client.get(f"/habits/{habit['id']}/streak/").json() == 1
+        assert [row["id"] for row in client.get(f"/habits/?user_id={user['id']}").json()] == [habit["id"]]
+
+        for index in range(shards.count):
+            db = shards.session(index)
+            stored = db.get(models.User, user["id"])
+            db.close()
+            assert (stored is not None) == (index == shard)
+
+
+def test_cross_shard_queries_fan_out(shards, monkeypatch):
+    """
+    Test case for queries spanning all shards.
+
+    It verifies that the admin shard report and the due-habits queue combine every shard.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    client = TestClient(app)
+    monkeypatch.setattr(security, "ADMIN_TOKEN", "secret")
+    habit_ids = []
+    for email in ["ada@example.com", "grace@example.com", "alan@example.com"]:
+        user = client.post("/auth/signup/", json={
+            "first_name": "Test", "last_name": "User", "email": email, "password": "password"}).json()
+        habit_ids.append(client.post(f"/habits/?user_id={user['id']}", json={
+            "name": "Sharded", "description": "Sharded", "periodicity": "daily"}).json()["id"])
+        client.put(f"/habits/{habit_ids[-1]}/checkoff?user_id={user['id']}")  # Due at the end of tomorrow
+
+    report = client.get("/admin/shards/", headers={"X-Admin-Token": "secret"}).json()
+    assert len(report["shards"]) == shards.count
+    assert report["totals"]["users"] == 3 and report["totals"]["habits"] == 3
+
+    due = client.get("/habits/due/", params={"within_minutes": 3 * 24 * 60}).json()
+    assert sorted(habit["id"] for habit in due["habits"]) == sorted(habit_ids)
+    first = client.get("/habits/due/", params={"within_minutes": 3 * 24 * 60, "limit": 1}).json()
+    second = client.get("/habits/due/", params={
+        "within_minutes": 3 * 24 * 60, "limit": 1, "cursor": first["next_cursor"]}).json()
+    assert first["habits"][0]["id"] != second["habits"][0]["id"]
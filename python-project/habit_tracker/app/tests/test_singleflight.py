@@ -0,0 +1,111 @@
+# habit_tracker/app/tests/test_singleflight.py
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.utils.cache import SharedMemoryCache
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_computation():
+    """
+    Test case for coalescing blocking calls.
+
+    It verifies that threads asking for the same key while it is computed share one
+    computation and its exception, and that a forgotten flight is not joined.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flights.do, ("streak", 1), compute, 0, 1)
+        started.wait()
+        followers = [pool.submit(flights.do, ("streak", 1), compute, 0, 1) for _ in range(3)]
+        while flights.coalesced < 3:
+            pass
+        release.set()
+        assert [future.result() for future in [leader, *followers]] == [1, 1, 1, 1]
+    assert flights.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("failing", fail)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_async_callers_share_one_task():
+    """
+    Test case for coalescing coroutines.
+
+    It verifies that concurrent awaiters share one task, that cancelling one caller does
+    not cancel the computation for the others, and that forget() starts a new computation.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    async def scenario():
+        flights = SingleFlight()
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            run = len(runs)
+            await asyncio.sleep(0.01)
+            return run
+
+        first = asyncio.ensure_future(flights.do_async("longest", compute, user_id=3))
+        second = asyncio.ensure_future(flights.do_async("longest", compute, user_id=3))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 1
+
+        pending = asyncio.ensure_future(flights.do_async("longest", compute, user_id=3))
+        await asyncio.sleep(0)
+        flights.forget(user_id=3)
+        assert await flights.do_async("longest", compute, user_id=3) == 3
+        assert await pending == 2
+        assert flights.stats() == {"executed": 3, "coalesced": 1, "in_flight": 0}
+
+    asyncio.run(scenario())
+
+
+def test_forgotten_leader_does_not_store_old_data(tmp_path):
+    """
+    Test case for a change made while a cached value is computed.
+
+    It verifies that a caller arriving after the invalidation does not join the running
+    computation and that the detached computation does not overwrite the fresh value.
+
+    Raises:
+        AssertionError: If the expected response does not match the actual response
+    """
+    cache = SharedMemoryCache(path=str(tmp_path / "cache.bin"), slots=16, slot_size=128, ttl=60, flights=SingleFlight())
+    started, release = threading.Event(), threading.Event()
+
+    def read_old_history():
+        started.set()
+        release.wait()
+        return "old"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(cache.cached, ("streak", 7), read_old_history, 0, 7)
+        started.wait()
+        cache.invalidate(habit_id=7)  # A check-off commits
+        assert cache.cached(("streak", 7), lambda: "new", habit_id=7) == "new"
+        release.set()
+        assert leader.result() == "old"
+    assert cache.get(("streak", 7)) == "new"
@@ -0,0 +1,228 @@
+# habit_tracker/app/utils/admission.py
+
+"""
+Admission control for expensive endpoints.
+
+Each protected route has its own ConcurrencyLimiter: at most `limit` requests run at
+once, up to `max_queue` more wait in a FIFO queue for at most `queue_timeout` seconds,
+and anything beyond is shed immediately with 503. Every user additionally has a token
+bucket per route, refused with 429. Both answers carry Retry-After.
+
+Waiting happens on the event loop before the endpoint is dispatched to the thread pool,
+so queued requests hold neither a worker thread nor a database connection.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from fastapi import HTTPException, Request
+
+# Requests of one expensive route running at the same time, per worker
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "4"))
+# Requests of one expensive route allowed to wait for a slot, per worker
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+# Seconds a queued request waits for a slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+# Sustained requests per second and burst size allowed per user and route
+USER_RATE_PER_SECOND = float(os.getenv("USER_RATE_PER_SECOND", "2"))
+USER_RATE_BURST = int(os.getenv("USER_RATE_BURST", "10"))
+
+# Number of token buckets kept before full ones are pruned
+_MAX_BUCKETS = 10_000
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets refilled continuously at `rate` tokens per second up to `burst`.
+
+    Attributes:
+        rejected (int): Number of refused requests.
+    """
+
+    def __init__(self, rate: float = USER_RATE_PER_SECOND, burst: int = USER_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.rejected = 0
+        self._buckets = {}  # key -> (tokens, monotonic time of the last update)
+        self._lock = threading.Lock()
+
+    def take(self, key) -> float:
+        """
+        Take one token from a key's bucket.
+
+        Args:
+            key (Hashable): Bucket key, e.g. a user ID.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > _MAX_BUCKETS:
+                self._prune(now)
+            return 0.0
+
+    def _prune(self, now):
+        """Forget buckets that have refilled completely; they are recreated full on demand."""
+        self._buckets = {key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+                         if tokens + (now - updated) * self.rate < self.burst}
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; `retry_after` is the suggested delay in seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Overloaded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue. All methods run on the event loop.
+
+    Attributes:
+        name (str): Name shown in the metrics.
+        limit (int): Maximum number of requests running at once.
+        max_queue (int): Maximum number of waiting requests.
+        queue_timeout (float): Seconds a request waits before it is shed.
+        admitted (int): Number of requests admitted.
+        shed (int): Number of requests refused because the queue was full.
+        timed_out (int): Number of requests refused after waiting queue_timeout.
+    """
+
+    def __init__(self, name: str, limit: int = ADMISSION_CONCURRENCY, max_queue: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        """
+        Wait for a slot.
+
+        Raises:
+            Overloaded: If the queue is full or no slot frees up within queue_timeout.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise Overloaded(self.queue_timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)  # Does not cancel the waiter
+        except asyncio.CancelledError:  # Client went away while queued
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise Overloaded(self.queue_timeout)
+        self.admitted += 1  # The slot was handed over by release()
+
+    def release(self):
+        """Free a slot, handing it directly to the longest-waiting request if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # Slot stays active, now owned by the waiter
+                return
+        self.active -= 1
+
+    def _abandon(self, waiter):
+        """Withdraw a waiter, giving back the slot if it was handed over in the meantime."""
+        if waiter.done():
+            self.release()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def stats(self) -> dict:
+        """
+        Current load and counters.
+
+        Returns:
+            dict: Counter values.
+        """
+        return {"limit": self.limit, "active": self.active, "queued": len(self._waiters),
+                "admitted": self.admitted, "shed": self.shed, "timed_out": self.timed_out}
+
+
+# Limiters and rate limiters of every protected route, by route name
+limiters = {}
+rate_limiters = {}
+
+
+def admission_control(name: str, limit: int = ADMISSION_CONCURRENCY, max_queue: int = ADMISSION_QUEUE_SIZE,
+                      queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, rate: float = USER_RATE_PER_SECOND,
+                      burst: int = USER_RATE_BURST):
+    """
+    Create a route dependency enforcing a per-user rate limit and a concurrency limit.
+
+    The user is identified by the `user_id` query parameter, or by the client address for
+    routes without one. Use it in the route's `dependencies` so it runs before the endpoint
+    and its database session.
+
+    Args:
+        name (str): Route name, used as the queue name in the metrics.
+        limit (int, optional): Maximum concurrent requests. Defaults to ADMISSION_CONCURRENCY.
+        max_queue (int, optional): Maximum queued requests. Defaults to ADMISSION_QUEUE_SIZE.
+        queue_timeout (float, optional): Maximum wait in seconds. Defaults to ADMISSION_QUEUE_TIMEOUT.
+        rate (float, optional): Requests per second per user. Defaults to USER_RATE_PER_SECOND.
+        burst (int, optional): Burst size per user. Defaults to USER_RATE_BURST.
+
+    Returns:
+        Callable: Async generator dependency.
+    """
+    limiter = limiters[name] = ConcurrencyLimiter(name, limit, max_queue, queue_timeout)
+    rate_limiter = rate_limiters[name] = TokenBucketLimiter(rate, burst)
+
+    async def admit(request: Request):
+        user_id = request.query_params.get("user_id")
+        key = ("user", user_id) if user_id else ("client", request.client.host if request.client else None)
+        wait = rate_limiter.take(key)
+        if wait:
+            raise HTTPException(status_code=429, detail="Rate limit exceeded",
+                                headers={"Retry-After": str(math.ceil(wait))})
+        try:
+            await limiter.acquire()
+        except Overloaded as error:
+            raise HTTPException(status_code=503, detail="Server busy, try again later",
+                                headers={"Retry-After": str(math.ceil(error.retry_after))})
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    return admit
+
+
+def admission_stats() -> dict:
+    """
+    Load and shed counters of every protected route.
+
+    Returns:
+        dict: Route name -> counters, including the rate-limited request count.
+    """
+    return {name: {**limiter.stats(), "rate_limited": rate_limiters[name].rejected}
+            for name, limiter in limiters.items()}
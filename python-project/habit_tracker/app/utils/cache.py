@@ -0,0 +1,314 @@
+# habit_tracker/app/utils/cache.py
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import orjson
+
+from app.utils.singleflight import SingleFlight, analytics_flights
+
+try:
+    import fcntl  # Cross-process file locks, POSIX only
+except ImportError:  # pragma: no cover - Windows runs a single process per cache file
+    fcntl = None
+
+# Location and size of the shared cache file; /dev/shm keeps it in memory on Linux
+CACHE_PATH = os.getenv(
+    "ANALYTICS_CACHE_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "habit_tracker_analytics.cache"),
+)
+CACHE_SLOTS = int(os.getenv("ANALYTICS_CACHE_SLOTS", "4096"))
+CACHE_SLOT_SIZE = int(os.getenv("ANALYTICS_CACHE_SLOT_SIZE", "256"))
+CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+# Number of invalidation generation counters, shared by users and habits
+CACHE_GENERATIONS = int(os.getenv("ANALYTICS_CACHE_GENERATIONS", "4096"))
+
+_MISSING = object()
+QUARTER_HOUR = 15 * 60
+
+
+class SharedMemoryCache:
+    """
+    Size-bounded key/value cache stored in an mmap-backed file shared by all worker processes on a host.
+
+    The file is divided into fixed-size slots grouped in small sets. A key hashes to one set and
+    may occupy any slot of it; when the set is full the entry closest to expiry is evicted, so
+    memory use never exceeds `slots * slot_size` bytes.
+
+    Invalidation is O(1): the file also holds a table of generation counters, one per user and
+    per habit (several IDs may share a counter, which only causes extra misses). Each slot
+    records the generations of its user and habit when the value was computed, and a lookup
+    ignores entries whose generations are no longer current, so invalidating bumps two
+    counters instead of scanning the slots.
+
+    Updates are made under an exclusive `flock` on the file (plus a thread lock within a
+    process), so readers in other workers never observe a half-written slot.
+
+    Attributes:
+        path (str): Path of the backing file.
+        slots (int): Total number of slots.
+        slot_size (int): Size of one slot in bytes, header included.
+        ttl (int): Default lifetime of an entry in seconds.
+        generations (int): Number of generation counters.
+        flights (SingleFlight): Coalesces concurrent computations of the same missing key, or None.
+    """
+    FILE_HEADER = struct.Struct("<8sIII")  # magic, slot count, slot size, generation count
+    GENERATION = struct.Struct("<Q")
+    # key hash, user_id, habit_id, user generation, habit generation, expires_at, payload length
+    SLOT_HEADER = struct.Struct("<QqqQQdI")
+    MAGIC = b"HTCACHE2"
+    WAYS = 8  # Slots per set
+
+    def __init__(self, path: str = CACHE_PATH, slots: int = CACHE_SLOTS, slot_size: int = CACHE_SLOT_SIZE,
+                 ttl: int = CACHE_TTL, generations: int = CACHE_GENERATIONS, flights: SingleFlight = None):
+        self.path = path
+        self.slots = max(self.WAYS, slots - slots % self.WAYS)
+        self.slot_size = slot_size
+        self.generations = max(2, generations)
+        self.ttl = ttl
+        self.flights = flights
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pid = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+
+    @property
+    def max_payload(self) -> int:
+        """int: Largest encoded value that fits in a slot."""
+        return self.slot_size - self.SLOT_HEADER.size
+
+    def _open(self):
+        """Map the backing file, (re)initializing it if its layout does not match this cache."""
+        if self._pid == os.getpid():
+            return
+        size = self._slots_start + self.slots * self.slot_size
+        self._file = os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+        self._flock(True)
+        try:
+            self._file.seek(0)
+            header = self._file.read(self.FILE_HEADER.size)
+            if header != self.FILE_HEADER.pack(self.MAGIC, self.slots, self.slot_size, self.generations):
+                self._file.truncate(0)  # Zero every counter and slot
+                self._file.truncate(size)
+                self._file.seek(0)
+                self._file.write(self.FILE_HEADER.pack(self.MAGIC, self.slots, self.slot_size, self.generations))
+                self._file.flush()
+        finally:
+            self._flock(False, unlock=True)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._pid = os.getpid()  # A forked worker maps the file again with its own lock state
+
+    def _flock(self, exclusive: bool, unlock: bool = False):
+        if fcntl is None:
+            return
+        if unlock:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the thread lock and a shared or exclusive file lock on the mapped cache."""
+        with self._lock:
+            self._open()
+            self._flock(exclusive)
+            try:
+                yield
+            finally:
+                self._flock(exclusive, unlock=True)
+
+    @staticmethod
+    def _hash(key) -> int:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1  # 0 marks an empty slot
+
+    @property
+    def _slots_start(self) -> int:
+        return self.FILE_HEADER.size + self.generations * self.GENERATION.size
+
+    def _offset(self, slot: int) -> int:
+        return self._slots_start + slot * self.slot_size
+
+    def _generation_offset(self, id: int, kind: int) -> int:
+        """Offset of the counter of a user (kind 0) or habit (kind 1); ID 0 means untagged."""
+        return self.FILE_HEADER.size + ((2 * id + kind) % self.generations) * self.GENERATION.size
+
+    def _read_generations(self, user_id: int, habit_id: int):
+        """Current generations of a user and habit; call with the file locked."""
+        return (self.GENERATION.unpack_from(self._map, self._generation_offset(user_id, 0))[0] if user_id else 0,
+                self.GENERATION.unpack_from(self._map, self._generation_offset(habit_id, 1))[0] if habit_id else 0)
+
+    def generations_of(self, user_id: int = 0, habit_id: int = 0):
+        """
+        Current invalidation generations of a user and habit.
+
+        Capture them before computing a value and pass them to `set`, so that a value
+        computed from data changed in the meantime is not stored.
+
+        Args:
+            user_id (int, optional): User the value depends on.
+            habit_id (int, optional): Habit the value depends on.
+
+        Returns:
+            Tuple[int, int]: Generations of the user and the habit.
+        """
+        with self._locked(exclusive=False):
+            return self._read_generations(user_id, habit_id)
+
+    def _set_slots(self, key_hash: int):
+        first = (key_hash % (self.slots // self.WAYS)) * self.WAYS
+        return range(first, first + self.WAYS)
+
+    def get(self, key, default=None):
+        """
+        Look up a value.
+
+        Args:
+            key (Hashable): Cache key.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value, or `default`.
+        """
+        key_hash = self._hash(key)
+        now = time.time()
+        with self._locked(exclusive=False):
+            for slot in self._set_slots(key_hash):
+                offset = self._offset(slot)
+                slot_hash, slot_user, slot_habit, user_generation, habit_generation, expires_at, length = (
+                    self.SLOT_HEADER.unpack_from(self._map, offset))
+                if slot_hash == key_hash and expires_at > now and (
+                        (user_generation, habit_generation) == self._read_generations(slot_user, slot_habit)):
+                    start = offset + self.SLOT_HEADER.size
+                    payload = self._map[start:start + length]
+                    self.hits += 1
+                    return orjson.loads(payload)
+        self.misses += 1
+        return default
+
+    def set(self, key, value, user_id: int = 0, habit_id: int = 0, expires_at: float = None, generations=None):
+        """
+        Store a value, evicting the entry closest to expiry if the key's set is full.
+
+        Values that do not fit in a slot are not cached, nor are values computed before the
+        last invalidation of their user or habit.
+
+        Args:
+            key (Hashable): Cache key.
+            value: JSON-serializable value.
+            user_id (int, optional): User the value depends on, used for invalidation.
+            habit_id (int, optional): Habit the value depends on, used for invalidation.
+            expires_at (float, optional): Expiry as a UNIX timestamp. Defaults to now + ttl.
+            generations (Tuple[int, int], optional): Result of `generations_of` captured before
+                computing the value. Defaults to the current generations.
+
+        Returns:
+            bool: True if the value was stored.
+        """
+        payload = orjson.dumps(value)
+        if len(payload) > self.max_payload:
+            return False
+        key_hash = self._hash(key)
+        now = time.time()
+        if expires_at is None:
+            expires_at = now + self.ttl
+        with self._locked(exclusive=True):
+            current = self._read_generations(user_id, habit_id)
+            if generations is not None and tuple(generations) != current:
+                return False  # Invalidated while the value was computed
+            victim, victim_expiry = None, None
+            for slot in self._set_slots(key_hash):
+                slot_hash, _, _, _, _, slot_expiry, _ = self.SLOT_HEADER.unpack_from(self._map, self._offset(slot))
+                if slot_hash == key_hash or slot_hash == 0 or slot_expiry <= now:
+                    victim, victim_expiry = slot, None
+                    break
+                if victim is None or slot_expiry < victim_expiry:
+                    victim, victim_expiry = slot, slot_expiry
+            if victim_expiry is not None:
+                self.evictions += 1
+            offset = self._offset(victim)
+            self._map[offset + self.SLOT_HEADER.size:offset + self.SLOT_HEADER.size + len(payload)] = payload
+            self.SLOT_HEADER.pack_into(self._map, offset, key_hash, user_id, habit_id, *current, expires_at, len(payload))
+        return True
+
+    def invalidate(self, user_id: int = None, habit_id: int = None):
+        """
+        Invalidate every entry computed for the given user or habit, in constant time.
+
+        Args:
+            user_id (int, optional): Invalidate entries tagged with this user.
+            habit_id (int, optional): Invalidate entries tagged with this habit.
+        """
+        if self.flights is not None:
+            self.flights.forget(user_id=user_id, habit_id=habit_id)  # Later misses must not join a stale computation
+        with self._locked(exclusive=True):
+            for id, kind in ((user_id, 0), (habit_id, 1)):
+                if id:
+                    offset = self._generation_offset(id, kind)
+                    self.GENERATION.pack_into(self._map, offset, self.GENERATION.unpack_from(self._map, offset)[0] + 1)
+
+    def clear(self):
+        """Evict every entry."""
+        with self._locked(exclusive=True):
+            for slot in range(self.slots):
+                self.SLOT_HEADER.pack_into(self._map, self._offset(slot), 0, 0, 0, 0, 0, 0.0, 0)
+
+    def cached(self, key, compute, user_id: int = 0, habit_id: int = 0):
+        """
+        Return the cached value for `key`, computing and storing it on a miss.
+
+        Entries never outlive the current quarter hour: streak and broken state change when
+        a user's local day rolls over, and every time zone's midnight falls on a quarter hour.
+        A value whose user or habit is invalidated while it is computed is returned but not
+        stored, so a computation that read data from before a change cannot outlive it.
+
+        Args:
+            key (Hashable): Cache key.
+            compute (Callable[[], Any]): Produces the value on a miss.
+            user_id (int, optional): User the value depends on.
+            habit_id (int, optional): Habit the value depends on.
+
+        Returns:
+            The cached or freshly computed value.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            def compute_and_store():
+                generations = self.generations_of(user_id, habit_id)  # Before reading any data
+                result = compute()
+                self._store(key, result, user_id, habit_id, generations)  # Skipped if invalidated meanwhile
+                return result
+
+            if self.flights is None:
+                return compute_and_store()
+            value = self.flights.do(key, compute_and_store, user_id=user_id, habit_id=habit_id)  # Concurrent misses share one computation
+        return value
+
+    def _store(self, key, value, user_id, habit_id, generations):
+        """Store a computed value until the end of its TTL or the current quarter hour, whichever comes first."""
+        now = time.time()
+        next_quarter_hour = (now // QUARTER_HOUR + 1) * QUARTER_HOUR
+        self.set(key, value, user_id=user_id, habit_id=habit_id, expires_at=min(now + self.ttl, next_quarter_hour),
+                 generations=generations)
+
+    def stats(self) -> dict:
+        """
+        Per-process hit, miss and eviction counters.
+
+        Returns:
+            dict: Counter values.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# Cache shared by the analytics and streak endpoints of every worker on this host
+analytics_cache = SharedMemoryCache(flights=analytics_flights)
@@ -0,0 +1,159 @@
+# habit_tracker/app/utils/memory.py
+
+"""
+Memory-allocation instrumentation based on tracemalloc.
+
+When MEMORY_TRACKING=1, tracemalloc is started with the application and
+MemoryTrackingMiddleware records the peak of memory allocated while each request runs,
+aggregated by route template (e.g. "/habits/{habit_id}/events/"). tracemalloc counts
+allocations of the whole process, so one request is measured at a time and requests
+arriving meanwhile are served unmeasured; allocations of requests running concurrently
+can still add to a measured peak. Tracing slows Python allocations down noticeably, so
+this is meant for benchmarks and staging rather than permanent production use.
+"""
+
+import os
+import threading
+import tracemalloc
+
+# Start tracemalloc with the application and measure requests
+MEMORY_TRACKING = os.getenv("MEMORY_TRACKING", "0") == "1"
+# Number of frames stored per allocation traceback
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+
+
+class RoutePeaks:
+    """
+    Peak allocated bytes per route.
+
+    Attributes:
+        routes (dict): Route template -> {"requests", "max_peak_bytes", "last_peak_bytes", "total_peak_bytes"}.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, peak: int):
+        """
+        Record the peak of one request.
+
+        Args:
+            route (str): Route template of the request.
+            peak (int): Bytes allocated at the peak, above the level when the request started.
+        """
+        with self._lock:
+            stats = self.routes.setdefault(
+                route, {"requests": 0, "max_peak_bytes": 0, "last_peak_bytes": 0, "total_peak_bytes": 0})
+            stats["requests"] += 1
+            stats["last_peak_bytes"] = peak
+            stats["total_peak_bytes"] += peak
+            stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak)
+
+    def stats(self) -> dict:
+        """
+        Per-route peaks, including the mean peak.
+
+        Returns:
+            dict: Route template -> counters.
+        """
+        with self._lock:
+            return {route: {**stats, "mean_peak_bytes": stats["total_peak_bytes"] // stats["requests"]}
+                    for route, stats in self.routes.items()}
+
+
+# Peaks measured by the middleware of this worker process
+route_peaks = RoutePeaks()
+_measure_lock = threading.Lock()  # Held while a request is measured
+
+
+def start_memory_tracking(frames: int = MEMORY_TRACE_FRAMES):
+    """
+    Start tracing allocations, if not already started.
+
+    Args:
+        frames (int, optional): Frames stored per traceback. Defaults to MEMORY_TRACE_FRAMES.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_memory_tracking():
+    """Stop tracing allocations and free the traces."""
+    tracemalloc.stop()
+
+
+def measure_peak(function, *args, **kwargs):
+    """
+    Call a function and measure the peak of memory it allocates.
+
+    Args:
+        function (Callable): Function to call.
+        *args: Positional arguments.
+        **kwargs: Keyword arguments.
+
+    Returns:
+        Tuple[Any, int]: The function's result and the peak in bytes above the starting level.
+    """
+    start_memory_tracking()
+    with _measure_lock:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = function(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[1] - baseline
+
+
+def top_allocation_sites(limit: int = 20, group_by: str = "lineno"):
+    """
+    List the source locations holding the most allocated memory right now.
+
+    Args:
+        limit (int, optional): Number of sites. Defaults to 20.
+        group_by (str, optional): "lineno", "filename" or "traceback". Defaults to "lineno".
+
+    Returns:
+        List[dict]: Site, allocated bytes and block count, largest first; empty when not tracing.
+    """
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    return [{"site": str(statistic.traceback), "size_bytes": statistic.size, "blocks": statistic.count}
+            for statistic in snapshot.statistics(group_by)[:limit]]
+
+
+def _route_template(scope) -> str:
+    """Path template of the matched route, including router prefixes, or the raw path if unmatched."""
+    context = scope.get("fastapi", {}).get("effective_route_context")  # Routes of included routers
+    if getattr(context, "path", None):
+        return context.path
+    return getattr(scope.get("route"), "path", scope["path"])
+
+
+class MemoryTrackingMiddleware:
+    """
+    Pure ASGI middleware recording the allocation peak of each request by route.
+
+    Does nothing unless tracemalloc is tracing.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracemalloc.is_tracing() or not _measure_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await self.app(scope, receive, send)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            route_peaks.record(_route_template(scope), peak)
+        finally:
+            _measure_lock.release()
@@ -0,0 +1,189 @@
+# habit_tracker/app/utils/profiling.py
+
+"""
+Opt-in CPU profiling of individual requests.
+
+A request is profiled when it carries `X-Profile: 1` together with a valid `X-Admin-Token`,
+or when it is picked by the PROFILE_SAMPLE_RATE sampling. Two cProfile profilers are used:
+ProfilingMiddleware profiles the event loop thread (routing, dependency resolution, async
+endpoints, response rendering) and ProfiledRoute profiles the endpoint function in the
+worker thread that runs it (queries, ORM hydration, streak loops). They are merged and
+written as a pstats file to PROFILE_DIR, named in the `X-Profile-Id` response header, and
+the top frames are kept for GET /admin/profiles/.
+
+Only one request is profiled at a time per worker; other requests are never slowed down
+except by the loop-thread profiler while it is active, and their loop-thread frames may
+appear in that profile.
+"""
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+from fastapi.routing import APIRoute
+from app.utils.security import is_admin_token
+
+logger = logging.getLogger(__name__)
+
+# Directory receiving the .pstats files (open with `python -m pstats` or snakeviz)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "habit_tracker_profiles"))
+# Fraction of requests profiled without being asked to, e.g. 0.001
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Number of frames reported per profile
+PROFILE_TOP_FRAMES = int(os.getenv("PROFILE_TOP_FRAMES", "15"))
+# Paths never profiled: long-lived streams would hold the profiler forever
+PROFILE_EXCLUDED_PATHS = ("/habits/stream/",)
+
+# Summaries of the most recent profiles, newest last
+recent_profiles = deque(maxlen=50)
+
+# Before Python 3.12 a cProfile profiler only sees the thread that enabled it; from 3.12 on it
+# uses sys.monitoring, sees every thread and cannot run alongside a second profiler
+_PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+_active_profile = contextvars.ContextVar("active_profile", default=None)
+_profile_lock = threading.Lock()  # Held while a request is profiled
+
+
+class RequestProfile:
+    """
+    Profiles collected for one request.
+
+    Attributes:
+        profile_id (str): File name of the profile, without directory.
+        loop_profiler (cProfile.Profile): Profiler of the event loop thread.
+        worker_profiler (cProfile.Profile): Profiler of the endpoint's worker thread.
+    """
+
+    def __init__(self, method: str, path: str):
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+        self.profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{method.lower()}-{slug}.pstats"
+        self.method = method
+        self.path = path
+        self.loop_profiler = cProfile.Profile()
+        self.worker_profiler = cProfile.Profile()
+
+    def save(self, elapsed: float) -> dict:
+        """
+        Merge the profilers, write the pstats file and summarize the top frames.
+
+        Args:
+            elapsed (float): Wall-clock duration of the request in seconds.
+
+        Returns:
+            dict: Profile ID, request, duration and top frames by own time.
+        """
+        stats = pstats.Stats(self.loop_profiler)
+        if self.worker_profiler.getstats():
+            stats.add(self.worker_profiler)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stats.dump_stats(os.path.join(PROFILE_DIR, self.profile_id))
+        return {"profile_id": self.profile_id, "method": self.method, "path": self.path,
+                "elapsed_ms": round(elapsed * 1000, 2), "top_frames": top_frames(stats)}
+
+
+def top_frames(stats: pstats.Stats, limit: int = PROFILE_TOP_FRAMES):
+    """
+    List the functions with the most own time in a profile.
+
+    Args:
+        stats (pstats.Stats): Profile statistics.
+        limit (int, optional): Number of functions. Defaults to PROFILE_TOP_FRAMES.
+
+    Returns:
+        List[dict]: Function, call count, own and cumulative time in milliseconds.
+    """
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [{"function": f"{os.path.basename(filename)}:{line}({name})", "calls": calls,
+             "own_ms": round(own * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)}
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows]
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware starting the profile of selected requests.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        sample_rate (float, optional): Fraction of requests profiled. Defaults to PROFILE_SAMPLE_RATE.
+    """
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def _wants_profile(self, scope) -> bool:
+        if scope["path"] in PROFILE_EXCLUDED_PATHS:
+            return False
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1" and is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)  # Another request is being profiled
+            return
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-profile-id", profile.profile_id.encode())]
+            await send(message)
+
+        token = _active_profile.set(profile)  # Copied into the worker thread running the endpoint
+        started = time.perf_counter()
+        profile.loop_profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.loop_profiler.disable()
+            _active_profile.reset(token)
+            try:
+                summary = profile.save(time.perf_counter() - started)
+                recent_profiles.append(summary)
+                logger.info("Profiled %s %s in %.1f ms: %s", profile.method, profile.path,
+                            summary["elapsed_ms"], summary["top_frames"][:3])
+            except Exception:
+                logger.exception("Could not save profile %s", profile.profile_id)
+            finally:
+                _profile_lock.release()
+
+
+def _profiled(endpoint):
+    """Wrap a synchronous endpoint so that it runs under the request's worker-thread profiler."""
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None or not _PER_THREAD_PROFILERS:
+            return endpoint(*args, **kwargs)
+        return profile.worker_profiler.runcall(endpoint, *args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route class profiling synchronous endpoints in their worker thread when the request is profiled.
+
+    Async endpoints run on the event loop and are covered by ProfilingMiddleware.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint) and not inspect.isasyncgenfunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
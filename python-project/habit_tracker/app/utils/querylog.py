@@ -0,0 +1,161 @@
+# habit_tracker/app/utils/querylog.py
+
+"""
+Statement timing and slow-query log.
+
+Every statement executed through an instrumented engine is timed between the
+`before_cursor_execute` and `after_cursor_execute` events. Statements slower than
+SLOW_QUERY_MS are logged with the shape of their bound parameters (types, never values)
+and kept in a ring buffer. For slow SELECTs on PostgreSQL the plan is captured with
+`EXPLAIN (ANALYZE, BUFFERS)` on a separate connection, at most once every
+EXPLAIN_INTERVAL seconds and one at a time, in a background thread.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Statements taking at least this many milliseconds are logged as slow
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Minimum number of seconds between two EXPLAIN captures
+EXPLAIN_INTERVAL = float(os.getenv("EXPLAIN_INTERVAL_SECONDS", "10"))
+# Number of slow statements kept for the admin endpoint
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "100"))
+# Longest statement text stored and logged
+MAX_STATEMENT_LENGTH = 2000
+
+# Connection.info key set on the connections running EXPLAIN, which are not timed
+_EXPLAIN_CONNECTION = "querylog_explain"
+
+
+def parameter_shape(parameters):
+    """
+    Describe bound parameters by type, without their values.
+
+    Args:
+        parameters: DBAPI parameters: a dict, a sequence, or a list of them for executemany.
+
+    Returns:
+        Parameter names or positions mapped to type names, e.g. {"habit_id_1": "int"}.
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return {"executemany": len(parameters), "rows": parameter_shape(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class QueryLog:
+    """
+    Timing statistics and slow statements of the instrumented engines.
+
+    Attributes:
+        threshold_ms (float): Duration from which a statement is slow.
+        explain_interval (float): Minimum seconds between EXPLAIN captures.
+        statements (int): Number of timed statements.
+        total_ms (float): Total duration of the timed statements.
+        slow (int): Number of slow statements.
+        slow_queries (deque): The most recent slow statements, oldest first.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain_interval: float = EXPLAIN_INTERVAL,
+                 buffer_size: int = SLOW_QUERY_BUFFER_SIZE):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.statements = 0
+        self.total_ms = 0.0
+        self.slow = 0
+        self.slow_queries = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._last_explain = float("-inf")
+        self._explaining = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+
+    def install(self, engine):
+        """
+        Time every statement executed by an engine.
+
+        Args:
+            engine (Engine): Engine to instrument.
+        """
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        if conn.info.get(_EXPLAIN_CONNECTION):
+            return  # Our own EXPLAIN
+        with self._lock:
+            self.statements += 1
+            self.total_ms += duration_ms
+        if duration_ms >= self.threshold_ms:
+            self._record_slow(conn.engine, statement, parameters, duration_ms)
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()  # The statement failed, no after_cursor_execute follows
+
+    def _record_slow(self, engine, statement, parameters, duration_ms):
+        shape = parameter_shape(parameters)
+        entry = {"at": datetime.utcnow().isoformat(), "duration_ms": round(duration_ms, 2),
+                 "statement": statement[:MAX_STATEMENT_LENGTH], "parameters": shape, "plan": None}
+        logger.warning("Slow query (%.1f ms): %s parameters=%s", duration_ms, entry["statement"], shape)
+        with self._lock:
+            self.slow += 1
+            self.slow_queries.append(entry)
+            explain = (engine.dialect.name == "postgresql" and statement.lstrip()[:6].upper() == "SELECT"
+                       and not self._explaining and time.monotonic() - self._last_explain >= self.explain_interval)
+            if explain:  # ANALYZE runs the statement again, so only read-only statements are explained
+                self._explaining = True
+                self._last_explain = time.monotonic()
+        if explain:
+            self._executor.submit(self._explain, engine, statement, parameters, entry)
+
+    def _explain(self, engine, statement, parameters, entry):
+        """Capture the plan of a slow statement on a separate connection, rolled back afterwards."""
+        try:
+            with engine.connect() as connection:
+                connection.info[_EXPLAIN_CONNECTION] = True
+                try:
+                    rows = connection.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+                    entry["plan"] = "\n".join(row[0] for row in rows)
+                finally:
+                    connection.info.pop(_EXPLAIN_CONNECTION, None)
+                    connection.rollback()
+        except Exception as error:
+            entry["plan"] = f"EXPLAIN failed: {error}"
+            logger.exception("Could not capture the plan of a slow query")
+        finally:
+            with self._lock:
+                self._explaining = False
+
+    def stats(self) -> dict:
+        """
+        Per-process counters and the slow statements, newest first.
+
+        Returns:
+            dict: Threshold, counters and slow statements with their plans.
+        """
+        with self._lock:
+            return {"threshold_ms": self.threshold_ms, "statements": self.statements,
+                    "total_ms": round(self.total_ms, 2), "slow": self.slow,
+                    "slow_queries": list(reversed(self.slow_queries))}
+
+
+# Query log of the application engine, installed by app.database
+query_log = QueryLog()
@@ -0,0 +1,96 @@
+# habit_tracker/app/utils/responses.py
+
+import orjson
+from fastapi import Request, Response
+
+
+class ORJSONResponse(Response):
+    """
+    JSON response rendered with orjson.
+
+    Used by the list endpoints that return plain column rows, so that large
+    result sets are encoded without going through Pydantic validation.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        """
+        Encode the response content with orjson.
+
+        Args:
+            content: JSON-compatible content (dicts, lists, datetimes, ...).
+
+        Returns:
+            bytes: Encoded JSON document.
+        """
+        return orjson.dumps(content)
+
+
+def rows_response(rows, fields):
+    """
+    Build a JSON response from plain column rows.
+
+    Args:
+        rows (Iterable[Row]): Rows returned by a column-only query.
+        fields (Tuple[str, ...]): Field names, in the same order as the row columns.
+
+    Returns:
+        ORJSONResponse: Response containing one JSON object per row.
+    """
+    return ORJSONResponse([dict(zip(fields, row)) for row in rows])  # Pair each column value with its field name
+
+
+def make_etag(*parts):
+    """
+    Build a weak entity tag from the parts identifying a representation.
+
+    Args:
+        *parts: Resource kind, identifiers and version, e.g. ("habit-events", 7, 12).
+
+    Returns:
+        str: Quoted weak ETag, or None if any part (typically the version) is None.
+    """
+    if any(part is None for part in parts):
+        return None  # Unknown resource, nothing to validate against
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str):
+    """
+    Check whether a request's If-None-Match header lists an entity tag.
+
+    Args:
+        request (Request): Incoming request.
+        etag (str): Current ETag of the requested representation.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")  # If-None-Match uses weak comparison
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def conditional_response(request: Request, etag: str, build):
+    """
+    Answer a conditional GET, building the response only if the client's copy is stale.
+
+    Args:
+        request (Request): Incoming request.
+        etag (str): Current ETag of the representation, or None if it cannot be validated.
+        build (Callable[[], Response]): Runs the queries and encodes the full response.
+
+    Returns:
+        Response: 304 Not Modified if If-None-Match matches, otherwise the built response
+            carrying the ETag.
+    """
+    if etag is not None and etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = build()
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return response
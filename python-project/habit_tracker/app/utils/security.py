@@ -1,10 +1,17 @@
 # habit_tracker/app/utils/security.py
 
+import hmac
+import os
+
+from fastapi import Header, HTTPException
 from passlib.context import CryptContext
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Token required in the X-Admin-Token header of admin endpoints; admin endpoints are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 def get_password_hash(password):
     """
     Generate a bcrypt hash for the given password.
@@ -29,3 +36,28 @@ def verify_password(plain_password, hashed_password):
         bool: True if passwords match, False otherwise
     """
     return pwd_context.verify(plain_password, hashed_password)  # Verify if plain password matches hashed password
+
+def is_admin_token(token: str) -> bool:
+    """
+    Check a token against the admin token in constant time.
+
+    Args:
+        token (str): Token presented by the client, or None.
+
+    Returns:
+        bool: True if admin endpoints are enabled and the token matches.
+    """
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()))
+
+def require_admin(x_admin_token: str = Header(None)):
+    """
+    Dependency restricting an endpoint to operators holding the admin token.
+
+    Args:
+        x_admin_token (str, optional): Value of the X-Admin-Token header.
+
+    Raises:
+        HTTPException: If admin endpoints are disabled or the token does not match (status_code=403).
+    """
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,149 @@
+# habit_tracker/app/utils/singleflight.py
+
+import asyncio
+import threading
+
+
+class _Flight:
+    """A computation in progress in a worker thread, and the callers waiting for it."""
+
+    def __init__(self, user_id: int, habit_id: int):
+        self.user_id = user_id
+        self.habit_id = habit_id
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations within a process.
+
+    The first caller for a key runs the computation; callers arriving while it is in
+    flight wait for it and receive the same result or exception. Works for blocking
+    calls made from the thread pool (`do`) and for coroutines on the event loop (`do_async`).
+
+    Flights are tagged with the user and habit they are computed for; `forget` detaches
+    matching flights after a change, so later callers start a fresh computation instead
+    of joining one that may have read the old data. The detached computation still
+    completes for its own callers; SharedMemoryCache does not store its result, because
+    the generations it captured are no longer current.
+
+    Attributes:
+        executed (int): Number of computations run.
+        coalesced (int): Number of calls served by another caller's computation.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._flights = {}  # key -> _Flight
+        self._tasks = {}  # key -> (asyncio.Task, user_id, habit_id)
+
+    def do(self, key, compute, user_id: int = 0, habit_id: int = 0):
+        """
+        Run a blocking computation, or wait for the identical one already in flight.
+
+        Args:
+            key (Hashable): Identifies the computation, e.g. ("longest_streak", user_id).
+            compute (Callable[[], Any]): The computation.
+            user_id (int, optional): User the result depends on.
+            habit_id (int, optional): Habit the result depends on.
+
+        Returns:
+            The result of the computation.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(user_id, habit_id)
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = compute()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:  # Not forgotten in the meantime
+                    del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    async def do_async(self, key, compute, user_id: int = 0, habit_id: int = 0):
+        """
+        Run a coroutine function, or await the identical computation already in flight.
+
+        The computation runs as its own task, so a caller that is cancelled (e.g. because
+        its client disconnected) does not cancel it for the others.
+
+        Args:
+            key (Hashable): Identifies the computation.
+            compute (Callable[[], Awaitable]): Coroutine function performing the computation.
+            user_id (int, optional): User the result depends on.
+            habit_id (int, optional): Habit the result depends on.
+
+        Returns:
+            The result of the computation.
+        """
+        with self._lock:
+            entry = self._tasks.get(key)
+            if entry is None:
+                task = asyncio.ensure_future(compute())
+                self._tasks[key] = (task, user_id, habit_id)
+                task.add_done_callback(lambda done: self._task_done(key, done))
+                self.executed += 1
+            else:
+                task = entry[0]
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _task_done(self, key, task):
+        with self._lock:
+            entry = self._tasks.get(key)
+            if entry is not None and entry[0] is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller went away
+
+    def forget(self, user_id: int = None, habit_id: int = None):
+        """
+        Detach the in-flight computations for a user or habit, so later callers recompute.
+
+        Args:
+            user_id (int, optional): Forget computations tagged with this user.
+            habit_id (int, optional): Forget computations tagged with this habit.
+        """
+        def matches(flight_user, flight_habit):
+            return bool((user_id and flight_user == user_id) or (habit_id and flight_habit == habit_id))
+
+        with self._lock:
+            for key in [key for key, flight in self._flights.items() if matches(flight.user_id, flight.habit_id)]:
+                del self._flights[key]
+            for key in [key for key, (_, flight_user, flight_habit) in self._tasks.items()
+                        if matches(flight_user, flight_habit)]:
+                del self._tasks[key]
+
+    def stats(self) -> dict:
+        """
+        Per-process counters.
+
+        Returns:
+            dict: Counter values and the number of computations in flight.
+        """
+        with self._lock:
+            in_flight = len(self._flights) + len(self._tasks)
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": in_flight}
+
+
+# Coalesces the computations behind analytics_cache misses
+analytics_flights = SingleFlight()
@@ -0,0 +1,66 @@
+# habit_tracker/app/utils/timezones.py
+
+from datetime import date, datetime, time, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "UTC"
+
+
+def get_zone(name: str) -> ZoneInfo:
+    """
+    Resolve an IANA time zone name.
+
+    Args:
+        name (str): Time zone name, e.g. "Europe/Sofia". None means UTC.
+
+    Returns:
+        ZoneInfo: The time zone.
+
+    Raises:
+        ValueError: If the time zone is unknown.
+    """
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)  # ZoneInfo caches instances by name
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {name!r}")
+
+
+def local_day(timestamp: datetime, name: str) -> date:
+    """
+    Convert a naive UTC timestamp to the calendar day in a time zone.
+
+    Args:
+        timestamp (datetime): Naive UTC timestamp.
+        name (str): Time zone name.
+
+    Returns:
+        date: Local calendar day of the timestamp.
+    """
+    return timestamp.replace(tzinfo=timezone.utc).astimezone(get_zone(name)).date()
+
+
+def local_today(name: str) -> date:
+    """
+    Current calendar day in a time zone.
+
+    Args:
+        name (str): Time zone name.
+
+    Returns:
+        date: Today's local date.
+    """
+    return datetime.now(get_zone(name)).date()
+
+
+def local_midnight_utc(day: date, name: str) -> datetime:
+    """
+    Start of a local calendar day, as a naive UTC timestamp.
+
+    Args:
+        day (date): Local calendar day.
+        name (str): Time zone name.
+
+    Returns:
+        datetime: Naive UTC timestamp of local midnight.
+    """
+    return datetime.combine(day, time.min, tzinfo=get_zone(name)).astimezone(timezone.utc).replace(tzinfo=None)
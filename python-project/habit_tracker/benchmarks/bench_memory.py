@@ -0,0 +1,144 @@
+# habit_tracker/benchmarks/bench_memory.py
+
+"""
+Measure the allocation peak of the hot read routes for a user with a long history and
+fail when a route exceeds its budget.
+
+Requests go through the full application (routing, dependencies, serialization) on an
+in-memory SQLite database, with the analytics cache cleared before each request so the
+computation itself is measured. Peaks are recorded by MemoryTrackingMiddleware.
+
+Run from the habit_tracker directory:
+
+    python -m benchmarks.bench_memory                  # exit status 1 if a budget is exceeded
+    python -m benchmarks.bench_memory --update         # rewrite the budgets from this run
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Configure the application before it is imported
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SEED_DATABASE", "0")
+os.environ.setdefault("ANALYTICS_CACHE_PATH", os.path.join(tempfile.gettempdir(), f"bench_memory_{os.getpid()}.cache"))
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.utils.cache import analytics_cache
+from app.utils.memory import route_peaks, start_memory_tracking, stop_memory_tracking
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "memory_budgets.json")
+HISTORY_SIZE = 20_000
+REPEAT = 3
+# Headroom added to measured peaks when budgets are rewritten
+BUDGET_HEADROOM = 1.5
+
+ROUTES = (
+    "/habits/?user_id={user_id}",
+    "/habits/{habit_id}/events/",
+    "/habits/{habit_id}/streak/",
+    "/habits/{habit_id}/is_broken/",
+    "/habits/dashboard/?user_id={user_id}",
+    "/analytics/habits/longest_streak/?user_id={user_id}",
+    "/analytics/habits/{habit_id}/longest_streak/",
+)
+
+
+def seed(size: int):
+    """
+    Create a user with one daily habit checked off on `size` consecutive days.
+
+    Args:
+        size (int): Number of events to create.
+
+    Returns:
+        Tuple[int, int]: IDs of the user and the habit.
+    """
+    db = SessionLocal()
+    user = models.User(first_name="Bench", last_name="User", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    habit = models.Habit(name="Bench", description="Bench", periodicity="daily", owner_id=user.id)
+    db.add(habit)
+    db.flush()
+    start = datetime.utcnow() - timedelta(days=size)
+    db.execute(models.HabitEvent.__table__.insert(), [
+        {"habit_id": habit.id, "timestamp": start + timedelta(days=i), "local_day": (start + timedelta(days=i)).date()}
+        for i in range(size)
+    ])  # Bulk insert without building ORM objects
+    db.commit()
+    ids = user.id, habit.id
+    db.close()
+    return ids
+
+
+def measure(size: int):
+    """
+    Request every route REPEAT times with allocation tracing on.
+
+    Args:
+        size (int): History size of the benchmark user.
+
+    Returns:
+        dict: Route template -> maximum peak in bytes.
+    """
+    Base.metadata.create_all(bind=engine)
+    user_id, habit_id = seed(size)
+    client = TestClient(app)
+    start_memory_tracking()
+    try:
+        for _ in range(REPEAT):
+            for route in ROUTES:
+                analytics_cache.clear()  # Measure the computation, not a cache hit
+                response = client.get(route.format(user_id=user_id, habit_id=habit_id))
+                response.raise_for_status()
+    finally:
+        stop_memory_tracking()
+    return {route: stats["max_peak_bytes"] for route, stats in route_peaks.stats().items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budgets", default=BUDGETS_PATH, help="JSON file of per-route budgets in bytes")
+    parser.add_argument("--events", type=int, default=None, help="history size (default: from the budgets file)")
+    parser.add_argument("--update", action="store_true", help="rewrite the budgets from the measured peaks")
+    args = parser.parse_args(argv)
+
+    budgets = {}
+    if os.path.exists(args.budgets):
+        with open(args.budgets) as file:
+            budgets = json.load(file)
+    size = args.events or budgets.get("history_size", HISTORY_SIZE)
+    peaks = measure(size)
+
+    if args.update:
+        budgets = {"history_size": size,
+                   "routes": {route: int(peak * BUDGET_HEADROOM) for route, peak in sorted(peaks.items())}}
+        with open(args.budgets, "w") as file:
+            json.dump(budgets, file, indent=2)
+            file.write("\n")
+        print(f"Budgets written to {args.budgets}")
+
+    exceeded = []
+    print(f"{'route':<48} {'peak':>10} {'budget':>10}")
+    for route, peak in sorted(peaks.items()):
+        budget = budgets.get("routes", {}).get(route)
+        status = "" if budget is None or peak <= budget else "  EXCEEDED"
+        print(f"{route:<48} {peak / 1024:>8.0f}kB {(budget or 0) / 1024:>8.0f}kB{status}")
+        if status:
+            exceeded.append(route)
+    if exceeded:
+        print(f"{len(exceeded)} route(s) over budget for a history of {size} events", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# habit_tracker/benchmarks/bench_serialization.py
+
+"""
+Compare the ORM + Pydantic serialization path of the event list endpoint
+with the column-row + orjson fast path.
+
+Run from the habit_tracker directory:
+
+    python -m benchmarks.bench_serialization
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models, schemas
+from app.database import Base
+from app.services.habits import get_habit_events, get_habit_event_rows, HABIT_EVENT_ROW_FIELDS
+from app.utils.responses import rows_response
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 5
+
+
+def seed(db, size: int):
+    """
+    Create one habit with `size` events.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        size (int): Number of events to create.
+
+    Returns:
+        int: ID of the created habit.
+    """
+    user = models.User(first_name="Bench", last_name="User", email=f"bench{size}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    habit = models.Habit(name="Bench", description="Bench", periodicity="daily", owner_id=user.id)
+    db.add(habit)
+    db.flush()
+    start = datetime.utcnow() - timedelta(days=size)
+    db.execute(models.HabitEvent.__table__.insert(), [
+        {"habit_id": habit.id, "timestamp": start + timedelta(days=i)} for i in range(size)
+    ])  # Bulk insert without building ORM objects
+    db.commit()
+    return habit.id
+
+
+def orm_path(db, habit_id: int, adapter: TypeAdapter):
+    """Serialize events the way a `from_attributes` response model does."""
+    events = get_habit_events(db, habit_id)
+    body = adapter.dump_json(adapter.validate_python(events, from_attributes=True))
+    db.expunge_all()  # Do not let the identity map carry objects between runs
+    return body
+
+
+def row_path(db, habit_id: int):
+    """Serialize events through the column-row fast path."""
+    return rows_response(get_habit_event_rows(db, habit_id), HABIT_EVENT_ROW_FIELDS).body
+
+
+def best_of(fn, *args):
+    """Return the best wall-clock time of REPEAT runs of fn(*args)."""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    adapter = TypeAdapter(List[schemas.HabitEvent])
+
+    print(f"{'rows':>8} {'orm+pydantic':>14} {'rows+orjson':>12} {'speedup':>8}")
+    for size in SIZES:
+        habit_id = seed(db, size)
+        orm_time = best_of(orm_path, db, habit_id, adapter)
+        row_time = best_of(row_path, db, habit_id)
+        print(f"{size:>8} {orm_time * 1000:>12.1f}ms {row_time * 1000:>10.1f}ms {orm_time / row_time:>7.1f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
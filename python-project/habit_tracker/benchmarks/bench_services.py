@@ -0,0 +1,219 @@
+# habit_tracker/benchmarks/bench_services.py
+
+"""
+Time the service-layer functions behind the hot endpoints across history sizes, from
+10 to 1,000,000 events per habit, and compare the scaling curves with a stored baseline.
+
+Each size gets a fresh in-memory SQLite database holding one user with one daily habit.
+Histories longer than MAX_HISTORY_DAYS are spread over that many days, several events
+per day, so every timestamp remains a valid date. Timings are the median of several runs.
+
+Run from the habit_tracker directory:
+
+    python -m benchmarks.bench_services                       # print the curves, compare with the baseline
+    python -m benchmarks.bench_services --save                # store this run as the baseline
+    python -m benchmarks.bench_services --sizes 10 1000       # a subset of the sizes
+
+The exit status is 1 when a function is slower than the baseline by more than the
+threshold (--threshold, 0.25 by default) at any size.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models, schemas
+from app.database import Base, enable_sqlite_savepoints
+from app.routers import analytics
+from app.services import habits, users
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "services_baseline.json")
+# Relative slowdown from which a timing counts as a regression
+REGRESSION_THRESHOLD = 0.25
+REPEAT = 5
+# Runs per function for the sizes from LARGE_SIZE upwards
+LARGE_REPEAT = 3
+LARGE_SIZE = 100_000
+# Longest history generated, in days; longer histories get several events per day
+MAX_HISTORY_DAYS = 100_000
+# Rows per INSERT while seeding
+SEED_BATCH_SIZE = 50_000
+
+_emails = itertools.count()  # Unique emails for create_user
+
+
+def seed(db, size: int):
+    """
+    Create a user with one daily habit and `size` events ending today.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        size (int): Number of events to create.
+
+    Returns:
+        Tuple[int, int]: IDs of the user and the habit.
+    """
+    user = models.User(first_name="Bench", last_name="User", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    habit = models.Habit(name="Bench", description="Bench", periodicity="daily", owner_id=user.id)
+    db.add(habit)
+    db.flush()
+    days = min(size, MAX_HISTORY_DAYS)
+    step = timedelta(days=days) / size
+    start = datetime.utcnow() - timedelta(days=days - 1)
+    for offset in range(0, size, SEED_BATCH_SIZE):
+        timestamps = (start + step * i for i in range(offset, min(offset + SEED_BATCH_SIZE, size)))
+        db.execute(models.HabitEvent.__table__.insert(), [
+            {"habit_id": habit.id, "timestamp": timestamp, "local_day": timestamp.date()} for timestamp in timestamps
+        ])  # Bulk insert without building ORM objects
+    db.commit()
+    return user.id, habit.id
+
+
+def new_user():
+    """Build a unique user payload for create_user."""
+    return schemas.UserCreate(first_name="Bench", last_name="User", email=f"new{next(_emails)}@example.com",
+                              password="bench-password")
+
+
+def cases(user_id: int, habit_id: int):
+    """
+    The benchmarked calls, by name.
+
+    Args:
+        user_id (int): ID of the seeded user.
+        habit_id (int): ID of the seeded habit.
+
+    Returns:
+        dict: Name -> function of the session running one call.
+    """
+    return {
+        "services.get_streak_for_habit": lambda db: habits.get_streak_for_habit(habit_id, db),
+        "analytics.get_streak_for_habit": lambda db: analytics.get_streak_for_habit(habit_id, db),
+        "is_habit_broken": lambda db: habits.is_habit_broken(habit_id, db),
+        "get_habits": lambda db: habits.get_habits(db, user_id),
+        "checkoff_habit": lambda db: habits.checkoff_habit(db, habit_id, user_id),
+        "create_user": lambda db: users.create_user(db, new_user()),
+    }
+
+
+def median_of(function, db, repeat: int):
+    """Return the median wall-clock time of `repeat` runs of function(db), with a clean session each run."""
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()  # Do not let the identity map carry objects between runs
+        start = time.perf_counter()
+        function(db)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(sizes):
+    """
+    Time every case at every size.
+
+    Args:
+        sizes (Iterable[int]): History sizes.
+
+    Returns:
+        dict: Case name -> {size (str): median seconds}.
+    """
+    results = {}
+    for size in sizes:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        enable_sqlite_savepoints(engine)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            user_id, habit_id = seed(db, size)
+            repeat = LARGE_REPEAT if size >= LARGE_SIZE else REPEAT
+            for name, function in cases(user_id, habit_id).items():
+                results.setdefault(name, {})[str(size)] = median_of(function, db, repeat)
+        finally:
+            db.close()
+            engine.dispose()
+        print(f"  measured {size} events", file=sys.stderr)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """
+    Find the timings slower than the baseline by more than the threshold.
+
+    Args:
+        results (dict): Timings of this run.
+        baseline (dict): Stored timings.
+        threshold (float): Allowed relative slowdown, e.g. 0.25.
+
+    Returns:
+        List[Tuple[str, str, float]]: Case name, size and ratio of each regression.
+    """
+    regressions = []
+    for name, timings in results.items():
+        for size, seconds in timings.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference and seconds > reference * (1 + threshold):
+                regressions.append((name, size, seconds / reference))
+    return regressions
+
+
+def print_curves(results: dict, baseline: dict):
+    """Print one row per case and one column per size, in milliseconds, with the ratio to the baseline."""
+    sizes = sorted({int(size) for timings in results.values() for size in timings})
+    print(f"{'function':<32}" + "".join(f"{size:>18}" for size in sizes))
+    for name, timings in results.items():
+        cells = []
+        for size in map(str, sizes):
+            reference = baseline.get(name, {}).get(size)
+            ratio = f" ({timings[size] / reference:.2f}x)" if reference else ""
+            cells.append(f"{timings[size] * 1000:.2f}ms{ratio}".rjust(18))
+        print(f"{name:<32}" + "".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="history sizes in events per habit")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON file of baseline timings")
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+
+    results = run(args.sizes)
+    print_curves(results, baseline)
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump({"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "machine": platform.machine(), "created_at": datetime.utcnow().isoformat(),
+                       "results": results}, file, indent=2)
+            file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, size, ratio in regressions:
+        print(f"REGRESSION {name} at {size} events: {ratio:.2f}x the baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())